@@ -2,19 +2,36 @@
 
 import asyncio
 import base64
+import itertools
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import cv2
+import numpy as np
 import psutil
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import (FastAPI, File, Query, Request, UploadFile, WebSocket,
+                     WebSocketDisconnect)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
+from capture import CameraSource, ReplaySource
+from client_metrics import parse_client_metrics
+from dedup import CaptureDeduper, CaptureIndex, capture_signature
+from face_index import FaceEmbedder, FaceIndex
+from motion import MotionGate, RoiFaceDetector
+from qos import LEVELS as QOS_LEVELS, QosGovernor
+from quality import BLUR_THRESHOLD, compute_face_metrics, quality_flags
+from result_cache import CachedModelManager, ResultCache
+from smile_gate import SmileCascade, SmileGate
+from smoothing import FaceSmoother
+from streaming import VideoBroadcaster, forward_to_websocket
+from tracing import MAX_TRACE_CAPACITY, tracer
 from wrapper import (AgeCaffeNet, EmotionFERPlus, GenderCaffeNet,
-                     ModelManager)
+                     ModelManager, set_log_level)
 
 # ===================================================================
 #  1. SETUP & CONFIGURATION
@@ -24,6 +41,8 @@ from wrapper import (AgeCaffeNet, EmotionFERPlus, GenderCaffeNet,
 # Create a reliable, absolute path to the 'captures' directory
 CAPTURES_DIR = Path(__file__).parent / "captures"
 CAPTURES_DIR.mkdir(exist_ok=True)
+# Face-embedding index lives outside 'captures' so the gallery listing stays images only
+INDEX_DIR = Path(__file__).parent / "index"
 
 app = FastAPI()
 
@@ -62,13 +81,145 @@ try:
 except Exception as e:
     print(f"[WARN] GenderCaffeNet not loaded: {e}")
 
+# --- Result cache (skips the model stack for near-identical face crops) ---
+cached_mgr = CachedModelManager(model_mgr, ResultCache(
+    max_size=int(os.environ.get("SMILAGE_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("SMILAGE_CACHE_TTL", 2.0)),
+    tolerance=int(os.environ.get("SMILAGE_CACHE_TOLERANCE", 4)),
+))
+
 # --- Global Settings & Constants ---
-BLUR_THRESHOLD = 100.0
 SMILE_THRESHOLD = 0.7
 DEFAULT_PREDICTIONS = {
     "emotion": "-", "age": "-", "gender": "-",
     "smile_score": 0.0, "is_blurry": False,
+    "brightness": 0.0, "face_ratio": 0.0,
 }
+STREAM_FPS = 30
+IDLE_FPS = 5  # Loop rate while the scene is static and no face is tracked
+
+# --- Load shedding ---
+# Over budget, the governor sheds work in this order: age/gender refresh,
+# detection resolution, emotion frequency, stream FPS (see qos.py).
+QOS_ENABLED = os.environ.get("SMILAGE_QOS", "1") == "1"
+FRAME_BUDGET_MS = float(os.environ.get("SMILAGE_FRAME_BUDGET_MS", 1000.0 / STREAM_FPS))
+qos_status = {}  # connection id -> its governor's stats
+
+def qos_summary() -> dict:
+    """Worst load-shedding level across live connections, plus every connection's governor."""
+    connections = list(qos_status.values())
+    worst = max(connections, key=lambda s: s["level"], default={"level": 0, "name": QOS_LEVELS[0]})
+    return {"level": worst["level"], "name": worst["name"], "connections": connections}
+
+# --- Process-wide commands over the WebSocket (log level) ---
+# Off by default: any client that can open /ws/video could otherwise use them.
+ADMIN_COMMANDS = os.environ.get("SMILAGE_ADMIN_COMMANDS", "0") == "1"
+
+# --- Browser-side render timings (frame worker decode/paint, per connection) ---
+client_render_metrics = {}
+_client_ids = itertools.count(1)
+_capture_seq = itertools.count()  # keeps same-millisecond capture names apart
+
+def record_client_metrics(client_id: int, data: dict):
+    try:
+        client_render_metrics[client_id] = parse_client_metrics(data)
+    except (TypeError, ValueError, AttributeError):
+        pass
+
+# --- Camera ---
+CAMERA_INDEX = int(os.environ.get("SMILAGE_CAMERA_INDEX", 0))
+CAMERA_WIDTH = int(os.environ.get("SMILAGE_CAMERA_WIDTH", 640))
+CAMERA_HEIGHT = int(os.environ.get("SMILAGE_CAMERA_HEIGHT", 480))
+CAMERA_FPS = int(os.environ.get("SMILAGE_CAMERA_FPS", 30))
+CAMERA_FOURCC = os.environ.get("SMILAGE_CAMERA_FOURCC", "MJPG")
+# Without server-side overlays the camera's own JPEG is forwarded as-is and
+# frames are decoded only at DETECT_FPS for detection/inference.
+SERVER_OVERLAYS = os.environ.get("SMILAGE_SERVER_OVERLAYS", "1") == "1"
+DETECT_FPS = float(os.environ.get("SMILAGE_DETECT_FPS", 10))
+# Replay a recorded session (scripts/record_session.py) instead of opening the camera.
+# Every WebSocket client gets its own replay, so load tests need no real cameras.
+REPLAY_PATH = os.environ.get("SMILAGE_REPLAY")
+# Unpaced (default) replays return every recorded frame in order, so runs are comparable;
+# paced ones drop frames the loop is too slow for, like a real camera.
+REPLAY_PACE = os.environ.get("SMILAGE_REPLAY_PACE", "0") == "1"
+# Replays still make the capture decision but, by default, write no photos,
+# index entries or dedup state (load tests would otherwise fill the gallery).
+SAVE_CAPTURES = not REPLAY_PATH or os.environ.get("SMILAGE_REPLAY_CAPTURES", "0") == "1"
+camera_status = {}
+
+# --- Optional video-codec streaming (/ws/video?codec=h264|vp8) ---
+# One shared encoder per codec: the first viewer drives the camera, later
+# viewers of the same codec receive the same encoded stream. The stream runs
+# until its last viewer leaves; only the first viewer can send commands.
+broadcasters = {}
+stream_tasks = set()  # capture loops still serving viewers after their first client left
+
+# --- Optional smile pre-filter ---
+# The Haar smile cascade gates FER+: the full model runs only when the cascade
+# fires (or stops firing), and otherwise every SMILAGE_SMILE_REFRESH frames.
+SMILE_PREFILTER = os.environ.get("SMILAGE_SMILE_PREFILTER", "0") == "1"
+SMILE_REFRESH = int(os.environ.get("SMILAGE_SMILE_REFRESH", 15))
+
+# --- Face search ("find all my selfies") ---
+# Embeddings are computed off the video loop, in a worker thread, after each capture.
+# A single thread also runs removals, so they happen after any queued indexing of the same file.
+FACE_INDEX_ENABLED = os.environ.get("SMILAGE_FACE_INDEX", "1") == "1"
+face_index = FaceIndex(INDEX_DIR) if FACE_INDEX_ENABLED else None
+index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-index")
+_embedder = None
+_embedder_error = None
+_embedder_lock = threading.Lock()
+
+def get_embedder():
+    """Creates the FaceEmbedder on first use (face_recognition is an optional extra)."""
+    global _embedder, _embedder_error
+    with _embedder_lock:  # called from the indexing thread and from search requests
+        if _embedder is None and _embedder_error is None:
+            try:
+                _embedder = FaceEmbedder()
+            except RuntimeError as e:
+                _embedder_error = str(e)
+                print(f"[WARN] Face search disabled: {e}")
+    return _embedder
+
+def index_capture(filename: str, frame: np.ndarray, boxes):
+    """Background stage: embed every face of a capture and add it to the index."""
+    embedder = get_embedder()
+    if embedder is None or face_index is None:
+        return
+    try:
+        with tracer.span("index_capture", cat="background"):
+            vectors, face_boxes = embedder.embed(frame, boxes if len(boxes) else None)
+            face_index.add(filename, vectors, face_boxes)
+    except Exception as e:
+        print(f"[WARN] Indexing {filename} failed: {e}")
+
+def unindex_capture(filename: str):
+    """Background stage: drop the faces of a deleted capture from the index."""
+    try:
+        face_index.remove(filename)
+    except Exception as e:
+        print(f"[WARN] Removing {filename} from the face index failed: {e}")
+
+# --- Near-duplicate suppression ---
+# Auto-captures are compared with recent ones (frame + face dHash, track id);
+# a near-duplicate is dropped or, if sharper, replaces the earlier capture.
+DEDUP_ENABLED = os.environ.get("SMILAGE_DEDUP", "1") == "1"
+capture_index = CaptureIndex(INDEX_DIR)
+capture_deduper = CaptureDeduper(window_s=float(os.environ.get("SMILAGE_DEDUP_WINDOW", 120)))
+
+def remove_capture(filename: str):
+    """Deletes a capture and its index entries. Raises FileNotFoundError."""
+    os.remove(CAPTURES_DIR / filename)
+    if face_index is not None:
+        index_executor.submit(unindex_capture, filename)
+    capture_index.remove(filename)
+    capture_deduper.forget(filename)
+
+# --- Live pipeline counters (reported by /api/metrics) ---
+pipeline_metrics = {"frames": 0, "undecoded_frames": 0, "static_frames": 0, "full_scans": 0, "roi_scans": 0,
+                    "smile_gated": 0, "duplicates_dropped": 0, "duplicates_replaced": 0,
+                    "replay_captures_skipped": 0}
 
 # ===================================================================
 #  2. API ENDPOINTS (for Gallery Management)
@@ -84,7 +235,7 @@ async def get_captures():
 async def delete_capture(filename: str):
     """Deletes a specific captured image."""
     try:
-        os.remove(CAPTURES_DIR / filename)
+        remove_capture(filename)
         return JSONResponse(content={"status": "success", "filename": filename})
     except FileNotFoundError:
         return JSONResponse(content={"status": "error", "message": "File not found"}, status_code=404)
@@ -96,8 +247,77 @@ async def delete_all_captures():
     for filename in os.listdir(CAPTURES_DIR):
         os.remove(CAPTURES_DIR / filename)
         count += 1
+    if face_index is not None:
+        index_executor.submit(face_index.clear)
+    capture_index.clear()
+    capture_deduper.reset()
     return JSONResponse(content={"status": "success", "deleted_count": count})
 
+@app.get("/api/captures/{filename}/similar")
+async def find_similar_captures(filename: str):
+    """Returns all captures that contain any face from the given capture."""
+    if face_index is None:
+        return JSONResponse(content={"status": "error", "message": "Face search disabled"}, status_code=503)
+    start = time.perf_counter()
+    # The index takes a file lock and may reload from disk: keep it off the event loop
+    loop = asyncio.get_running_loop()
+    vectors = await loop.run_in_executor(None, face_index.vectors_for, filename)
+    if len(vectors) == 0:
+        return JSONResponse(content={"status": "error", "message": "No indexed faces for this capture"}, status_code=404)
+    matches = await loop.run_in_executor(None, face_index.search, vectors)
+    return JSONResponse(content={"matches": matches, "took_ms": (time.perf_counter() - start) * 1000})
+
+@app.post("/api/search")
+async def search_by_photo(file: UploadFile = File(...)):
+    """Finds all captures of the person in an uploaded photo (largest face is used)."""
+    loop = asyncio.get_running_loop()
+    # The first call imports face_recognition/dlib, which takes seconds
+    embedder = await loop.run_in_executor(None, get_embedder) if face_index is not None else None
+    if embedder is None:
+        return JSONResponse(content={"status": "error", "message": "Face search disabled"}, status_code=503)
+    image = cv2.imdecode(np.frombuffer(await file.read(), dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return JSONResponse(content={"status": "error", "message": "Invalid image"}, status_code=400)
+    start = time.perf_counter()
+    vectors, boxes = await loop.run_in_executor(None, embedder.embed, image)
+    if len(vectors) == 0:
+        return JSONResponse(content={"status": "error", "message": "No face found"}, status_code=422)
+    largest = int(np.argmax([w * h for _, _, w, h in boxes]))
+    matches = await loop.run_in_executor(None, face_index.search, vectors[largest:largest + 1])
+    return JSONResponse(content={"matches": matches, "took_ms": (time.perf_counter() - start) * 1000})
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Returns runtime metrics (result cache, live pipeline counters and load-shedding level)."""
+    return JSONResponse(content={
+        "result_cache": cached_mgr.cache.stats(),
+        "pipeline": pipeline_metrics,
+        "camera": camera_status,
+        "streams": {codec: b.stats() for codec, b in broadcasters.items()},
+        "face_index": {"faces": len(face_index) if face_index is not None else 0},
+        "qos": qos_summary(),
+        "dedup": capture_deduper.stats(),
+        "client_render": list(client_render_metrics.values()),
+    })
+
+@app.post("/api/trace/start")
+async def start_trace(capacity: int = Query(None, gt=0, le=MAX_TRACE_CAPACITY)):
+    """Starts recording per-frame / per-stage spans into a fresh ring buffer (default: current capacity)."""
+    tracer.start(capacity)
+    return JSONResponse(content={"status": "recording", "capacity": tracer.events.maxlen})
+
+@app.post("/api/trace/stop")
+async def stop_trace():
+    """Stops recording; the buffer is kept for export."""
+    tracer.stop()
+    return JSONResponse(content={"status": "stopped", "spans": len(tracer.events)})
+
+@app.get("/api/trace")
+async def export_trace():
+    """Returns the recorded spans as Chrome trace JSON (open in ui.perfetto.dev)."""
+    return JSONResponse(content=tracer.export_chrome(),
+                        headers={"Content-Disposition": "attachment; filename=smilage_trace.json"})
+
 # ===================================================================
 #  3. WEBSOCKET (for Live Video & Commands)
 # ===================================================================
@@ -105,10 +325,58 @@ async def delete_all_captures():
 @app.websocket("/ws/video")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    client_id = next(_client_ids)
+
+    # --- Video-codec mode: join an existing stream as a viewer ---
+    codec = websocket.query_params.get("codec")
+    broadcaster = viewer = None
+    if codec and codec in broadcasters:
+        viewer = broadcasters[codec].subscribe()
+
+        async def forward():
+            try:
+                await forward_to_websocket(websocket, viewer)
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+
+        # Viewers only watch: the client that opened the stream controls the camera
+        async def receive_viewer_messages():
+            try:
+                while True:
+                    data = await websocket.receive_json()
+                    action = data.get("action")
+                    if action == "client_metrics":
+                        record_client_metrics(client_id, data)
+                    else:
+                        await websocket.send_json(
+                            {"error": f"'{action}' is not available to viewers of a shared {codec} stream"})
+            except WebSocketDisconnect:
+                pass
+            finally:
+                client_render_metrics.pop(client_id, None)
+
+        tasks = [asyncio.create_task(forward()), asyncio.create_task(receive_viewer_messages())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if codec in broadcasters:
+                broadcasters[codec].unsubscribe(viewer)
+        print("[INFO] Stream viewer disconnected.")
+        return
+    if codec:
+        try:
+            broadcaster = VideoBroadcaster(codec, fps=STREAM_FPS)
+            broadcasters[codec] = broadcaster
+            viewer = broadcaster.subscribe()
+        except (RuntimeError, ValueError) as e:
+            print(f"[WARN] Video streaming unavailable, falling back to JPEG: {e}")
 
     # --- Shared state between concurrent tasks ---
     manual_capture_trigger = asyncio.Event()
     run_benchmark_flag = asyncio.Event()
+    disconnected = asyncio.Event()
 
     # --- Task 1: Receive messages from the frontend ---
     async def receive_messages():
@@ -123,69 +391,211 @@ async def websocket_endpoint(websocket: WebSocket):
                     SMILE_THRESHOLD = float(data.get("value", SMILE_THRESHOLD))
                 elif action == "run_benchmark":
                     run_benchmark_flag.set()
+                elif action == "set_log_level":
+                    if not ADMIN_COMMANDS:
+                        await websocket.send_json({"error": "set_log_level is disabled (SMILAGE_ADMIN_COMMANDS=1)"})
+                        continue
+                    try:
+                        await websocket.send_json({"log_level": set_log_level(data.get("level", "INFO"))})
+                    except ValueError as e:
+                        await websocket.send_json({"error": str(e)})
+                elif action == "client_metrics":
+                    record_client_metrics(client_id, data)
         except WebSocketDisconnect:
             print("[INFO] Frontend disconnected.")
+        finally:
+            disconnected.set()
+            client_render_metrics.pop(client_id, None)
+            if viewer is not None:
+                broadcaster.unsubscribe(viewer)  # ends send_stream()
 
     # --- Task 2: Stream video and predictions to the frontend ---
     async def send_video():
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        if REPLAY_PATH:
+            camera = ReplaySource(REPLAY_PATH, passthrough=not SERVER_OVERLAYS, pace=REPLAY_PACE)
+        else:
+            camera = CameraSource(CAMERA_INDEX, CAMERA_WIDTH, CAMERA_HEIGHT, CAMERA_FPS, CAMERA_FOURCC,
+                                  passthrough=not SERVER_OVERLAYS)
+        if not camera.open():
             print("(!) Cannot open webcam")
+            if broadcaster is not None:
+                broadcaster.close()
+                broadcasters.pop(codec, None)
             return
+        camera_status.clear()
+        camera_status.update(camera.negotiated)
+        print(f"[INFO] Camera negotiated: {camera.negotiated}")
+
+        # Passthrough: decode only the frames the detector needs
+        camera_fps = camera.negotiated["fps"] or CAMERA_FPS
+        decode_every = max(1, round(camera_fps / DETECT_FPS)) if camera.passthrough else 1
+        frame_index = 0
+        # Motion state of the last analysed frame; undecoded frames keep its pacing
+        is_moving = True
 
         face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        face_detector = RoiFaceDetector(face_cascade, scale_factor=1.3, min_neighbors=5)
+        motion_gate = MotionGate()
+        faces, track_ids = face_detector.last_boxes, []
+        predictions, is_smiling_flag = DEFAULT_PREDICTIONS.copy(), False
+        smoother = FaceSmoother(
+            emotion_labels=getattr(model_mgr.active_emotion, "labels", EmotionFERPlus.DEFAULT_EMOTIONS),
+            age_labels=AgeCaffeNet.AGE_BUCKETS,
+            gender_labels=GenderCaffeNet.GENDER_LIST,
+            smile_threshold=SMILE_THRESHOLD,
+        )
+        qos = QosGovernor(FRAME_BUDGET_MS) if QOS_ENABLED else QosGovernor(max_level=0)
+        smile_gate = None
+        if SMILE_PREFILTER:
+            try:
+                smile_gate = SmileGate(SmileCascade(), refresh_interval=SMILE_REFRESH)
+            except RuntimeError as e:
+                print(f"[WARN] Smile pre-filter disabled: {e}")
         last_capture_time = 0
         CAPTURE_COOLDOWN = 3.0
+        MANUAL_CAPTURE_TRIES = 5  # analysed frames without a face before a manual capture is dropped
+        manual_misses = 0
         benchmark_data = {"frame_count": 0}
         BENCHMARK_DURATION_FRAMES = 100
 
         try:
-            while True:
-                ret, frame = cap.read()
+            # A shared codec stream keeps running for its remaining viewers after this client left
+            while not disconnected.is_set() or (broadcaster is not None and broadcaster.viewers):
+                frame_t0 = tracer.now()
+                ret, captured = camera.read()
                 if not ret:
                     await asyncio.sleep(0.01)
                     continue
+                tracer.complete("capture", frame_t0)
 
-                start_time = time.time()
+                start_time = time.time()  # also the frame's capture timestamp in the payload
                 is_benchmarking_active = benchmark_data["frame_count"] > 0
 
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-
-                predictions = DEFAULT_PREDICTIONS.copy()
+                frame_index += 1
+                pipeline_metrics["frames"] += 1
                 is_captured = False
-                is_smiling_flag = False
-
-                if len(faces) > 0:
-                    # Process the largest face
-                    x, y, w, h = sorted(faces, key=lambda f: f[2] * f[3], reverse=True)[0]
-                    face_img = frame[y:y+h, x:x+w]
-
-                    # Get predictions
-                    emotion, em_conf = model_mgr.predict_emotion(face_img)
-                    age, _ = model_mgr.predict_age(face_img)
-                    gender, _ = model_mgr.predict_gender(face_img)
-                    is_blurry = bool(cv2.Laplacian(cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var() < BLUR_THRESHOLD)
-                    predictions.update({"emotion": emotion, "age": age, "gender": gender, "smile_score": em_conf if emotion == "happiness" else 0, "is_blurry": is_blurry})
-                    
-                    # Check for smile and capture conditions
-                    is_smiling = emotion == "happiness" and em_conf >= SMILE_THRESHOLD
-                    if is_smiling:
-                        is_smiling_flag = True
-
-                    can_capture_again = (time.time() - last_capture_time) > CAPTURE_COOLDOWN
-                    if (is_smiling and can_capture_again) or manual_capture_trigger.is_set():
-                        filename = f"selfie_{int(time.time())}.jpg"
-                        cv2.imwrite(str(CAPTURES_DIR / filename), frame)
-                        print(f"Selfie captured: {filename}")
-                        last_capture_time, is_captured = time.time(), True
-                        manual_capture_trigger.clear()
-
-                    # Draw overlays
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 204, 153), 2)
-                    cv2.putText(frame, f"Age: {age}", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
-                    cv2.putText(frame, f"Emotion: {emotion}", (x, y + h + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-                    cv2.putText(frame, f"Gender: {gender}", (x, y + h + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
+                analyze = frame_index % decode_every == 0 or manual_capture_trigger.is_set()
+                if not analyze:
+                    pipeline_metrics["undecoded_frames"] += 1
+                else:
+                    with tracer.span("decode"):
+                        frame = captured.image
+                    if frame is None:  # corrupt MJPEG frame
+                        continue
+                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+                    # Detection only when the scene or a tracked face changed; static frames reuse the last faces
+                    is_moving = motion_gate.update(gray, faces) or manual_capture_trigger.is_set()
+                    if is_moving:
+                        with tracer.span("detect"):
+                            faces = face_detector.detect(gray, scale=qos.detect_scale)
+                        track_ids = smoother.update_tracks(faces)
+                        if smile_gate is not None:
+                            smile_gate.prune(track_ids)
+                        pipeline_metrics[f"{face_detector.last_scan}_scans"] += 1
+                    else:
+                        pipeline_metrics["static_frames"] += 1
+
+                    predictions = DEFAULT_PREDICTIONS.copy()
+                    is_smiling_flag = False
+
+                    if len(faces) > 0:
+                        # Quality metrics for all faces, reusing the detection gray frame
+                        metrics = compute_face_metrics(gray, faces)
+                        flags = quality_flags(metrics, BLUR_THRESHOLD)
+
+                        # Process the largest face
+                        i = int(np.argmax(metrics["size_ratio"]))
+                        x, y, w, h = (int(v) for v in faces[i])
+                        face_img = frame[y:y+h, x:x+w]
+
+                        # Get predictions (skipped while the scene or the smoothed state is static)
+                        tid = track_ids[i]
+                        smoother.smile_threshold = SMILE_THRESHOLD
+                        if is_moving:
+                            if not smoother.should_infer(tid):
+                                smoother.skip(tid)
+                            elif smile_gate is not None and not smile_gate.should_run(tid, gray, faces[i]):
+                                smoother.skip(tid)
+                                pipeline_metrics["smile_gated"] += 1
+                            elif not qos.run_emotion():
+                                smoother.skip(tid)
+                            else:
+                                age_gender = qos.refresh_age_gender or smoother.needs_age_gender(tid)
+                                smoother.update(tid, **cached_mgr.predict_proba_all(face_img, age_gender=age_gender))
+                        result = smoother.result(tid)
+                        emotion, age, gender = result["emotion"], result["age"], result["gender"]
+                        predictions.update({
+                            "emotion": emotion, "age": age, "gender": gender,
+                            "smile_score": result["smile_score"],
+                            "is_blurry": bool(flags["is_blurry"][i]),
+                            "brightness": float(metrics["brightness"][i]),
+                            "face_ratio": float(metrics["size_ratio"][i]),
+                        })
+
+                        # Check for smile (with hysteresis) and capture conditions
+                        is_smiling = result["is_smiling"]
+                        if is_smiling:
+                            is_smiling_flag = True
+
+                        # Auto-capture only well-exposed, sharp, large-enough faces
+                        can_capture_again = (time.time() - last_capture_time) > CAPTURE_COOLDOWN
+                        is_manual = manual_capture_trigger.is_set()
+                        if (is_smiling and can_capture_again and flags["is_ok"][i]) or is_manual:
+                            # Manual captures are always kept; auto-captures are deduplicated
+                            signature = capture_signature(gray, faces[i])
+                            sharpness = float(metrics["sharpness"][i])
+                            action, previous = "keep", None
+                            if not SAVE_CAPTURES:
+                                action = "skip"
+                            elif DEDUP_ENABLED and not is_manual:
+                                action, previous = capture_deduper.check(signature, int(tid), sharpness)
+
+                            if action == "skip":
+                                pipeline_metrics["replay_captures_skipped"] += 1
+                            elif action == "drop":
+                                pipeline_metrics["duplicates_dropped"] += 1
+                            else:
+                                # Millisecond timestamp first, so the gallery's name sort stays chronological
+                                filename = f"selfie_{int(time.time() * 1000)}_{int(tid)}_{next(_capture_seq)}.jpg"
+                                if captured.jpeg is not None:
+                                    (CAPTURES_DIR / filename).write_bytes(captured.jpeg)
+                                else:
+                                    cv2.imwrite(str(CAPTURES_DIR / filename), frame)
+                                print(f"Selfie captured: {filename}")
+                                if action == "replace":
+                                    # The new shot is a sharper near-duplicate of an earlier one
+                                    try:
+                                        remove_capture(previous["filename"])
+                                    except FileNotFoundError:
+                                        pass
+                                    pipeline_metrics["duplicates_replaced"] += 1
+                                    print(f"Replaced near-duplicate: {previous['filename']}")
+                                capture_index.add(capture_deduper.remember(filename, signature, int(tid), sharpness,
+                                                                             manual=is_manual))
+                                if face_index is not None:
+                                    asyncio.get_running_loop().run_in_executor(
+                                        index_executor, index_capture, filename, frame.copy(), faces.copy())
+                                is_captured = True
+                            # Dropped duplicates also restart the cooldown
+                            last_capture_time = time.time()
+                            manual_capture_trigger.clear()
+                            manual_misses = 0
+
+                        # Draw overlays
+                        predictions["face_box"] = [x, y, w, h]
+                        if SERVER_OVERLAYS:
+                            cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 204, 153), 2)
+                            cv2.putText(frame, f"Age: {age}", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 0), 2)
+                            cv2.putText(frame, f"Emotion: {emotion}", (x, y + h + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                            cv2.putText(frame, f"Gender: {gender}", (x, y + h + 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
+                    elif manual_capture_trigger.is_set():
+                        # Nobody in frame: stop forcing full scans instead of waiting for a face
+                        manual_misses += 1
+                        if manual_misses >= MANUAL_CAPTURE_TRIES:
+                            print("[INFO] Manual capture dropped: no face in frame.")
+                            manual_capture_trigger.clear()
+                            manual_misses = 0
 
                 # --- Benchmark Logic ---
                 if run_benchmark_flag.is_set():
@@ -198,7 +608,8 @@ async def websocket_endpoint(websocket: WebSocket):
                     benchmark_data["cpu"].append(psutil.cpu_percent())
                     benchmark_data["mem"].append(psutil.virtual_memory().percent)
                     benchmark_data["frame_count"] += 1
-                    await websocket.send_json({"benchmark_progress": benchmark_data["frame_count"] / BENCHMARK_DURATION_FRAMES})
+                    if not disconnected.is_set():
+                        await websocket.send_json({"benchmark_progress": benchmark_data["frame_count"] / BENCHMARK_DURATION_FRAMES})
 
                     if benchmark_data["frame_count"] >= BENCHMARK_DURATION_FRAMES:
                         avg_time = sum(benchmark_data["times"]) / len(benchmark_data["times"])
@@ -208,26 +619,76 @@ async def websocket_endpoint(websocket: WebSocket):
                             "avg_frame_time_ms": avg_time * 1000,
                             "fps": 1.0 / avg_time if avg_time > 0 else 0
                         }
-                        await websocket.send_json({"benchmark_results": results})
+                        if not disconnected.is_set():
+                            await websocket.send_json({"benchmark_results": results})
                         benchmark_data["frame_count"] = 0  # End benchmark
 
                 # --- Send Final Payload ---
-                _, buffer = cv2.imencode(".jpg", frame)
-                frame_b64 = base64.b64encode(buffer).decode("utf-8")
-                payload = {"frame": frame_b64, "predictions": predictions, "is_smiling": is_smiling_flag}
+                if broadcaster is not None:
+                    image = captured.image  # decoded lazily on passthrough frames
+                    if image is None:  # corrupt MJPEG frame: the encoder would take the stream down
+                        continue
+                    # Encoded once, shared with every viewer of this codec
+                    payload = {"predictions": predictions, "is_smiling": is_smiling_flag, "ts": start_time,
+                               "qos": qos.level}
+                    if is_captured:
+                        payload["capture"] = True
+                    with tracer.span("encode"):
+                        broadcaster.publish(image, payload)
+                    if analyze and is_moving:  # undecoded / static frames would dilute the load signal
+                        qos.record((time.time() - start_time) * 1000)
+                    tracer.complete("frame", frame_t0, cat="frame", frame=frame_index, qos=qos.level)
+                    qos_status[client_id] = qos.stats()
+                    await asyncio.sleep(1 / (qos.stream_fps(STREAM_FPS) if is_moving or len(faces) else IDLE_FPS))
+                    continue
+
+                with tracer.span("encode"):
+                    if captured.jpeg is not None and not SERVER_OVERLAYS:
+                        buffer = captured.jpeg
+                    else:
+                        _, buffer = cv2.imencode(".jpg", captured.image)
+                    frame_b64 = base64.b64encode(buffer).decode("utf-8")
+                payload = {"frame": frame_b64, "predictions": predictions, "is_smiling": is_smiling_flag,
+                           "ts": start_time, "qos": qos.level}
                 if is_captured:
                     payload["capture"] = True
-                await websocket.send_json(payload)
-                await asyncio.sleep(1/30)  # ~30 FPS
+                with tracer.span("send"):
+                    await websocket.send_json(payload)
+                if analyze and is_moving:  # undecoded / static frames would dilute the load signal
+                    qos.record((time.time() - start_time) * 1000)
+                tracer.complete("frame", frame_t0, cat="frame", frame=frame_index, qos=qos.level)
+                qos_status[client_id] = qos.stats()
+                await asyncio.sleep(1 / (qos.stream_fps(STREAM_FPS) if is_moving or len(faces) else IDLE_FPS))
 
         except WebSocketDisconnect:
             print("[INFO] Frontend disconnected from video stream.")
         finally:
-            cap.release()
+            camera.release()
             print("Camera released.")
+            qos_status.pop(client_id, None)
+            if broadcaster is not None:
+                broadcaster.close()
+                broadcasters.pop(codec, None)
 
-    # --- Run both tasks concurrently ---
-    await asyncio.gather(receive_messages(), send_video())
+    # --- Task 3 (video-codec mode): forward encoded packets to this client ---
+    async def send_stream():
+        try:
+            await forward_to_websocket(websocket, viewer)
+        except (WebSocketDisconnect, RuntimeError):
+            disconnected.set()
+
+    # --- Run all tasks concurrently ---
+    video_task = asyncio.create_task(send_video())
+    tasks = [receive_messages()]
+    if broadcaster is not None:
+        tasks.append(send_stream())
+    await asyncio.gather(*tasks)
+    if broadcaster is not None and broadcaster.viewers:
+        # Other viewers are still watching: the capture loop outlives this connection
+        stream_tasks.add(video_task)
+        video_task.add_done_callback(stream_tasks.discard)
+        return
+    await video_task
 
 # ===================================================================
 #  4. SERVE REACT APP (Must be last)
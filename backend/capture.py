@@ -0,0 +1,271 @@
+# backend/capture.py
+"""
+Camera capture with format negotiation and optional MJPEG passthrough.
+
+Many USB webcams fall back to low-FPS YUYV when opened with driver defaults.
+CameraSource requests resolution, FPS and FOURCC explicitly (MJPG by default)
+and reads back what the driver actually accepted.
+
+In passthrough mode the camera's own JPEG bytes are returned undecoded
+(V4L2 raw mode), so they can be forwarded to clients or written to disk
+without a decode/re-encode round trip. Pixels are decoded lazily, only for
+the frames that the detector actually looks at.
+
+A camera session can be recorded to disk (SessionRecorder) and replayed by
+the server in place of a camera (ReplaySource), for load tests that need
+neither real cameras nor browsers. A session directory holds the camera's
+JPEG frames back to back (frames.mjpeg), one JSON line per frame with its
+offset, size and capture time (index.jsonl), and the negotiated format
+(meta.json).
+"""
+
+import json
+import mmap
+import os
+import time
+
+import cv2
+import numpy as np
+
+# -------------------------
+# Defaults
+# -------------------------
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+CAMERA_FPS = 30
+CAMERA_FOURCC = "MJPG"
+
+
+def _fourcc_to_str(value) -> str:
+    code = int(value)
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00") or "?"
+
+
+def _as_jpeg(raw):
+    """Returns the bytes if `raw` is an encoded JPEG buffer, else None."""
+    if raw is None or raw.dtype != np.uint8 or raw.size < 4:
+        return None
+    if raw.ndim == 3 or (raw.ndim == 2 and raw.shape[0] != 1):
+        return None
+    buf = raw.reshape(-1)
+    if buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    return buf.tobytes()
+
+
+class CapturedFrame:
+    """A camera frame that is decoded on first access to `.image`."""
+    __slots__ = ("jpeg", "_image")
+
+    def __init__(self, image=None, jpeg=None):
+        self._image = image
+        self.jpeg = jpeg
+
+    @property
+    def image(self):
+        if self._image is None and self.jpeg is not None:
+            self._image = cv2.imdecode(np.frombuffer(self.jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return self._image
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._image is not None
+
+
+class CameraSource:
+    def __init__(self, index=0, width: int = CAMERA_WIDTH, height: int = CAMERA_HEIGHT,
+                 fps: int = CAMERA_FPS, fourcc: str = CAMERA_FOURCC, passthrough: bool = False):
+        self.index = index
+        self.requested = {"width": width, "height": height, "fps": fps, "fourcc": fourcc}
+        self.want_passthrough = passthrough
+        self.passthrough = False
+        self.negotiated = {}
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.index)
+        if not self.cap.isOpened():
+            return False
+
+        req = self.requested
+        # FOURCC must be set before the size/FPS, otherwise many drivers ignore it
+        if req["fourcc"]:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*req["fourcc"]))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, req["width"])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, req["height"])
+        self.cap.set(cv2.CAP_PROP_FPS, req["fps"])
+
+        self.negotiated = {
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": float(self.cap.get(cv2.CAP_PROP_FPS)),
+            "fourcc": _fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            "backend": self.cap.getBackendName(),
+        }
+
+        if self.want_passthrough and self.negotiated["fourcc"] == "MJPG":
+            self.passthrough = self._enable_passthrough()
+        self.negotiated["passthrough"] = self.passthrough
+        return True
+
+    def _enable_passthrough(self) -> bool:
+        # Raw mode: V4L2 hands back the undecoded MJPEG buffer
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        self.cap.set(cv2.CAP_PROP_FORMAT, -1)
+        ret, raw = self.cap.read()
+        if ret and _as_jpeg(raw) is not None:
+            return True
+        # Backend does not support it: go back to decoded frames
+        self.cap.set(cv2.CAP_PROP_FORMAT, 0)
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        return False
+
+    def isOpened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self):
+        """Returns (ok, CapturedFrame)."""
+        ret, raw = self.cap.read()
+        if not ret:
+            return False, None
+        if self.passthrough:
+            jpeg = _as_jpeg(raw)
+            # A truncated MJPEG buffer is dropped like a failed read
+            return (True, CapturedFrame(jpeg=jpeg)) if jpeg is not None else (False, None)
+        return True, CapturedFrame(image=raw)
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+# -------------------------
+# Session record / replay
+# -------------------------
+class SessionRecorder:
+    def __init__(self, directory, meta: dict = None, jpeg_quality: int = 90):
+        self.directory = str(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.jpeg_quality = jpeg_quality
+        self._frames = open(os.path.join(self.directory, "frames.mjpeg"), "wb")
+        self._index = open(os.path.join(self.directory, "index.jsonl"), "w", encoding="utf-8")
+        with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta or {}, f)
+        self._offset = 0
+        self._t0 = None
+        self.frames = 0
+
+    def write(self, frame: CapturedFrame, t: float = None):
+        """Appends one frame; `t` is its capture time (defaults to now)."""
+        t = time.monotonic() if t is None else t
+        if self._t0 is None:
+            self._t0 = t
+        jpeg = frame.jpeg
+        if jpeg is None:
+            _, buf = cv2.imencode(".jpg", frame.image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            jpeg = buf.tobytes()
+        self._frames.write(jpeg)
+        self._index.write(json.dumps({"t": round(t - self._t0, 6), "offset": self._offset, "size": len(jpeg)}) + "\n")
+        self._offset += len(jpeg)
+        self.frames += 1
+
+    def close(self):
+        self._frames.close()
+        self._index.close()
+
+
+class ReplaySource:
+    """
+    Drop-in replacement for CameraSource that plays a recorded session.
+
+    Frames always come out in recorded order. By default every read()
+    returns the next frame, so two runs see exactly the same frames. With
+    `pace` they are released at their recorded times; like a real camera, a
+    slow reader then skips to the newest due frame instead of falling
+    behind. The frame data is memory-mapped, so concurrent replays of one
+    session share it.
+    """
+
+    def __init__(self, directory, passthrough: bool = False, loop: bool = True, pace: bool = False):
+        self.directory = str(directory)
+        self.want_passthrough = passthrough
+        self.passthrough = False
+        self.loop = loop
+        self.pace = pace
+        self.negotiated = {}
+        self.index = []
+        self._file = None
+        self._data = None
+        self._pos = 0
+        self._t0 = None
+
+    def open(self):
+        try:
+            with open(os.path.join(self.directory, "index.jsonl"), "r", encoding="utf-8") as f:
+                self.index = [json.loads(line) for line in f if line.strip()]
+            meta_path = os.path.join(self.directory, "meta.json")
+            meta = {}
+            if os.path.exists(meta_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            self._file = open(os.path.join(self.directory, "frames.mjpeg"), "rb")
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Cannot open replay session {self.directory}: {e}")
+            return False
+        if not self.index:
+            return False
+
+        # Recorded frames are always JPEG, so passthrough is free
+        self.passthrough = self.want_passthrough
+        width, height = meta.get("width", 0), meta.get("height", 0)
+        if not (width and height):
+            first = self.index[0]
+            image = cv2.imdecode(np.frombuffer(self._data, dtype=np.uint8, count=first["size"], offset=first["offset"]),
+                                 cv2.IMREAD_GRAYSCALE)
+            if image is not None:
+                height, width = image.shape[:2]
+        duration = self.index[-1]["t"]
+        self.negotiated = {
+            "width": width,
+            "height": height,
+            "fps": (len(self.index) - 1) / duration if duration > 0 else float(meta.get("fps", 0)),
+            "fourcc": "MJPG",
+            "backend": "replay",
+            "passthrough": self.passthrough,
+            "frames": len(self.index),
+        }
+        return True
+
+    def isOpened(self) -> bool:
+        return self._data is not None
+
+    def read(self):
+        """Returns (ok, CapturedFrame); (False, None) while the next frame is not due yet."""
+        if self._pos >= len(self.index):
+            if not self.loop:
+                return False, None
+            self._pos, self._t0 = 0, None
+
+        if self.pace:
+            now = time.monotonic()
+            if self._t0 is None:
+                self._t0 = now - self.index[self._pos]["t"]
+            elapsed = now - self._t0
+            if elapsed < self.index[self._pos]["t"]:
+                return False, None
+            while self._pos + 1 < len(self.index) and self.index[self._pos + 1]["t"] <= elapsed:
+                self._pos += 1
+
+        entry = self.index[self._pos]
+        self._pos += 1
+        jpeg = self._data[entry["offset"]:entry["offset"] + entry["size"]]
+        return True, CapturedFrame(jpeg=jpeg)
+
+    def release(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,31 @@
+# backend/client_metrics.py
+"""
+Validation of the browser's 'client_metrics' reports (frame worker decode /
+paint timings, per connection), which /api/metrics serves back as JSON.
+"""
+
+import math
+import time
+
+STAT_FIELDS = ("avg", "p95", "max")
+
+
+def _finite(value) -> float:
+    number = float(value)
+    if not math.isfinite(number):  # JSON has no inf/nan: /api/metrics could not be serialised
+        raise ValueError(f"Non-finite metric value: {value!r}")
+    return number
+
+
+def parse_client_metrics(data: dict) -> dict:
+    """Keeps only the numeric fields of a report. Raises ValueError / TypeError / AttributeError."""
+    def stat(name):
+        values = data.get(name) or {}
+        return {k: _finite(values.get(k, 0.0)) for k in STAT_FIELDS}
+    return {
+        "frames": int(_finite(data.get("frames", 0))),
+        "dropped": int(_finite(data.get("dropped", 0))),
+        "decode_ms": stat("decode_ms"),
+        "paint_ms": stat("paint_ms"),
+        "updated": time.time(),
+    }
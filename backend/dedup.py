@@ -0,0 +1,206 @@
+# backend/dedup.py
+"""
+Near-duplicate capture suppression.
+
+Each capture gets a compact signature: the 64-bit dHash of the whole frame
+(pose, framing, people in view) and of the face crop (expression). Before
+a capture is written it is compared with the recent captures held in
+memory. A near-duplicate is dropped, or replaces the kept capture if it is
+noticeably sharper. Matches within the same face track use the normal
+tolerance; across tracks the tolerance is halved, so two different guests
+in the same spot are not merged.
+
+Signatures are appended to a capture index (captures.jsonl), which
+`scripts/dedup_captures.py` uses to bulk-dedup existing folders. Removals
+are appended as tombstones, so workers sharing the file never drop each
+other's entries.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from face_index import file_lock, read_json_lines
+from result_cache import dhash, hamming
+
+# -------------------------
+# Defaults
+# -------------------------
+DEDUP_WINDOW_S = 120.0         # Only captures this recent are compared
+DEDUP_MAX_RECENT = 32          # Recent signatures kept in memory
+FRAME_TOLERANCE = 10           # Max differing bits of the frame hash
+FACE_TOLERANCE = 8             # Max differing bits of the face hash
+OTHER_TRACK_FACTOR = 0.5       # Tolerance multiplier when the track differs
+SHARPER_MARGIN = 1.10          # A duplicate must be 10% sharper to replace a capture
+COMPACT_MIN_TOMBSTONES = 256   # Rewrite the index once it holds this many tombstones (and more than entries)
+
+
+def capture_signature(gray, box=None) -> dict:
+    """Frame and face-crop dHashes of a gray frame (face hash None without a box)."""
+    face = None
+    if box is not None:
+        x, y, w, h = (int(v) for v in box)
+        crop = gray[y:y+h, x:x+w]
+        face = dhash(crop) if crop.size else None
+    return {"frame": dhash(gray), "face": face}
+
+
+def is_near_duplicate(a: dict, b: dict, same_track: bool = False,
+                      frame_tolerance: int = FRAME_TOLERANCE, face_tolerance: int = FACE_TOLERANCE) -> bool:
+    factor = 1.0 if same_track else OTHER_TRACK_FACTOR
+    if hamming(a["frame"], b["frame"]) > frame_tolerance * factor:
+        return False
+    if a.get("face") is not None and b.get("face") is not None:
+        return hamming(a["face"], b["face"]) <= face_tolerance * factor
+    return True
+
+
+# -------------------------
+# Persistent capture index
+# -------------------------
+class CaptureIndex:
+    """
+    JSON lines of {filename, frame, face, sharpness, track, time}; hashes stored as hex.
+    remove() appends {"deleted": filename} lines; compact() rewrites the file without them.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(str(directory), "captures.jsonl")
+        self.lock_path = os.path.join(str(directory), "captures.lock")
+        os.makedirs(str(directory), exist_ok=True)
+        self._lock = threading.Lock()
+        with file_lock(self.lock_path, exclusive=False):
+            self._entries, self._tombstones = self._read()
+
+    @property
+    def entries(self):
+        return list(self._entries.values())
+
+    def _read(self):
+        """filename -> entry, replaying adds and tombstones in file order."""
+        entries, tombstones = {}, 0
+        for record, _ in read_json_lines(self.path):
+            if "deleted" in record:
+                entries.pop(record["deleted"], None)
+                tombstones += 1
+            else:
+                entries.pop(record["filename"], None)
+                entries[record["filename"]] = self._decode(record)
+        return entries, tombstones
+
+    @staticmethod
+    def _encode(entry: dict) -> dict:
+        out = dict(entry)
+        for key in ("frame", "face"):
+            if out.get(key) is not None:
+                out[key] = f"{out[key]:016x}"
+        return out
+
+    @staticmethod
+    def _decode(entry: dict) -> dict:
+        for key in ("frame", "face"):
+            if entry.get(key) is not None:
+                entry[key] = int(entry[key], 16)
+        return entry
+
+    def _append(self, records):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+
+    def add(self, entry: dict):
+        with self._lock, file_lock(self.lock_path):
+            self._append([self._encode(entry)])
+            self._entries.pop(entry["filename"], None)
+            self._entries[entry["filename"]] = entry
+
+    def remove(self, filenames):
+        """Tombstones the captures (also entries this process has not loaded); returns how many were known."""
+        filenames = set([filenames] if isinstance(filenames, str) else filenames)
+        if not filenames:
+            return 0
+        with self._lock, file_lock(self.lock_path):
+            self._append([{"deleted": f} for f in sorted(filenames)])
+            removed = sum(self._entries.pop(f, None) is not None for f in filenames)
+            self._tombstones += len(filenames)
+            if self._tombstones >= max(COMPACT_MIN_TOMBSTONES, len(self._entries)):
+                self._rewrite()
+        return removed
+
+    def _rewrite(self):
+        # Re-read under the file lock: the file holds every worker's entries, memory only ours
+        self._entries, _ = self._read()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(self._encode(e)) + "\n" for e in self._entries.values())
+        os.replace(tmp, self.path)
+        self._tombstones = 0
+
+    def compact(self):
+        with self._lock, file_lock(self.lock_path):
+            self._rewrite()
+
+    def clear(self):
+        with self._lock, file_lock(self.lock_path):
+            self._entries = {}
+            self._tombstones = 0
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+# -------------------------
+# Live deduplication
+# -------------------------
+class CaptureDeduper:
+    def __init__(self, window_s: float = DEDUP_WINDOW_S, max_recent: int = DEDUP_MAX_RECENT,
+                 frame_tolerance: int = FRAME_TOLERANCE, face_tolerance: int = FACE_TOLERANCE,
+                 sharper_margin: float = SHARPER_MARGIN):
+        self.window_s = window_s
+        self.frame_tolerance = frame_tolerance
+        self.face_tolerance = face_tolerance
+        self.sharper_margin = sharper_margin
+        self.recent = deque(maxlen=max_recent)
+        self.kept = 0
+        self.dropped = 0
+        self.replaced = 0
+
+    def check(self, signature: dict, track_id=None, sharpness: float = 0.0, now: float = None):
+        """
+        Returns (action, previous entry): "keep" (new capture), "drop" (duplicate,
+        not sharper, or of a manual capture) or "replace" (duplicate, sharper
+        than `previous`). Manual captures are never replaced.
+        """
+        now = time.time() if now is None else now
+        for entry in reversed(self.recent):
+            if now - entry["time"] > self.window_s:
+                break
+            same_track = track_id is not None and entry["track"] == track_id
+            if is_near_duplicate(signature, entry, same_track, self.frame_tolerance, self.face_tolerance):
+                if not entry.get("manual") and sharpness > entry["sharpness"] * self.sharper_margin:
+                    self.replaced += 1
+                    return "replace", entry
+                self.dropped += 1
+                return "drop", entry
+        self.kept += 1
+        return "keep", None
+
+    def remember(self, filename: str, signature: dict, track_id=None, sharpness: float = 0.0,
+                 now: float = None, manual: bool = False) -> dict:
+        """Adds a written capture; returns its index entry."""
+        entry = {"filename": filename, "frame": signature["frame"], "face": signature.get("face"),
+                 "sharpness": round(float(sharpness), 2), "track": track_id,
+                 "time": time.time() if now is None else now, "manual": bool(manual)}
+        self.recent.append(entry)
+        return entry
+
+    def forget(self, filename: str):
+        for entry in [e for e in self.recent if e["filename"] == filename]:
+            self.recent.remove(entry)
+
+    def reset(self):
+        """Forgets all recent captures (e.g. after the gallery was cleared)."""
+        self.recent.clear()
+
+    def stats(self) -> dict:
+        return {"kept": self.kept, "dropped": self.dropped, "replaced": self.replaced}
@@ -0,0 +1,354 @@
+# backend/face_index.py
+"""
+Face-embedding index for "find all my selfies" gallery search.
+
+Every captured photo gets one 128-d face_recognition embedding per detected
+face. Vectors are stored append-only as raw float32 rows (embeddings.f32)
+with a parallel JSON-lines id map (ids.jsonl: capture filename + face box),
+so adding a capture is one small write and loading is a single np.fromfile.
+
+Removing a capture appends a tombstone (deleted.jsonl) instead of rewriting
+the files; they are compacted once COMPACT_RATIO of the rows are dead. Every
+write holds an exclusive file lock and every read first picks up what other
+processes appended, so gunicorn workers can share one index directory.
+
+Search is an exact, vectorised Euclidean scan (the metric face_recognition
+is tuned for, match if distance <= 0.6). Past APPROX_THRESHOLD vectors an
+optional hnswlib index is used for candidates, which are then re-ranked
+exactly.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no multi-worker mode, the thread lock is enough
+    fcntl = None
+
+# -------------------------
+# Defaults
+# -------------------------
+EMBEDDING_DIM = 128
+MATCH_TOLERANCE = 0.6          # face_recognition's default same-person distance
+APPROX_THRESHOLD = 100_000     # Use the approximate index above this many vectors
+APPROX_CANDIDATES = 256        # Candidates fetched from the approximate index
+COMPACT_RATIO = 0.25           # Compact once this fraction of the rows is deleted
+COMPACT_MIN_ROWS = 256         # ... and at least this many rows are
+
+
+@contextmanager
+def file_lock(path, exclusive: bool = True):
+    """Advisory inter-process lock (flock) on `path`; a no-op without fcntl."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a+b") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def read_json_lines(path, offset: int = 0):
+    """
+    Complete JSON lines of `path` after byte `offset`, as (record, end offset)
+    pairs. A torn last line (writer crashed mid-append) is left unread.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return []
+    records, start = [], 0
+    while True:
+        end = data.find(b"\n", start)
+        if end < 0:
+            return records
+        if data[start:end].strip():
+            records.append((json.loads(data[start:end]), offset + end + 1))
+        start = end + 1
+
+
+class FaceEmbedder:
+    """face_recognition wrapper. The (heavy) import happens once, at construction."""
+
+    def __init__(self, num_jitters: int = 1, model: str = "small"):
+        try:
+            import face_recognition
+        except Exception as e:
+            raise RuntimeError(f"face_recognition is required for face search: {e}")
+        self._fr = face_recognition
+        self.num_jitters = num_jitters
+        self.model = model
+
+    def embed(self, bgr: np.ndarray, boxes=None):
+        """
+        One float32 vector per face. `boxes` are (x, y, w, h); if omitted,
+        faces are found with face_recognition's own detector.
+        Returns (vectors N x 128, boxes as (x, y, w, h)).
+        """
+        rgb = np.ascontiguousarray(bgr[:, :, ::-1])
+        if boxes is None:
+            locations = self._fr.face_locations(rgb)
+        else:
+            locations = [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in boxes]
+        if not locations:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32), []
+        vectors = self._fr.face_encodings(rgb, locations, num_jitters=self.num_jitters, model=self.model)
+        out_boxes = [(left, top, right - left, bottom - top) for top, right, bottom, left in locations]
+        return np.asarray(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIM), out_boxes
+
+
+class FaceIndex:
+    def __init__(self, directory, dim: int = EMBEDDING_DIM):
+        self.directory = str(directory)
+        self.dim = dim
+        self.vectors_path = os.path.join(self.directory, "embeddings.f32")
+        self.ids_path = os.path.join(self.directory, "ids.jsonl")
+        self.deleted_path = os.path.join(self.directory, "deleted.jsonl")
+        self.generation_path = os.path.join(self.directory, "generation")
+        self.lock_path = os.path.join(self.directory, "faces.lock")
+        self._lock = threading.Lock()
+        try:
+            import hnswlib  # optional: approximate candidates for very large indexes
+        except Exception:
+            hnswlib = None
+        self._hnswlib = hnswlib
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, file_lock(self.lock_path, exclusive=False):
+            self._reload()
+
+    # -------------------------
+    # Storage
+    # -------------------------
+    def _read_generation(self) -> int:
+        try:
+            with open(self.generation_path, "r", encoding="utf-8") as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _reload(self):
+        self.generation = self._read_generation()
+        self.ids = []
+        self._rows_by_file = {}
+        self._dead = 0
+        self._ids_offset = self._deleted_offset = 0
+        self._approx = None
+        self._approx_size = 0
+        self._set_vectors(np.zeros((0, self.dim), dtype=np.float32))
+        self._read_appended()
+
+    def _sync(self):
+        """Picks up rows and tombstones written by other processes (file lock held)."""
+        if self._read_generation() != self.generation:
+            self._reload()  # compacted or cleared elsewhere: row numbers changed
+        else:
+            self._read_appended()
+
+    def _read_appended(self):
+        records = read_json_lines(self.ids_path, self._ids_offset)
+        if records:
+            if os.path.exists(self.vectors_path):
+                vectors = np.fromfile(self.vectors_path, dtype=np.float32, count=len(records) * self.dim,
+                                      offset=self._n * self.dim * 4).reshape(-1, self.dim)
+            else:
+                vectors = np.zeros((0, self.dim), dtype=np.float32)
+            # A crash between the two appends can leave them out of step: keep the common prefix
+            records = records[:len(vectors)]
+            if records:
+                self._append_rows([r for r, _ in records], vectors[:len(records)])
+                self._ids_offset = records[-1][1]
+        for tombstone, end in read_json_lines(self.deleted_path, self._deleted_offset):
+            self._kill(tombstone["filename"], tombstone["rows"])
+            self._deleted_offset = end
+
+    def _set_vectors(self, vectors):
+        n = len(vectors)
+        self._buf = np.empty((max(n, 64), self.dim), dtype=np.float32)
+        self._norm_buf = np.empty(len(self._buf), dtype=np.float32)
+        self._live_buf = np.ones(len(self._buf), dtype=bool)
+        self._buf[:n] = vectors
+        self._norm_buf[:n] = np.einsum("ij,ij->i", self._buf[:n], self._buf[:n])
+        self._n = n
+        self.vectors, self.sq_norms, self.live = self._buf[:n], self._norm_buf[:n], self._live_buf[:n]
+
+    def _append_vectors(self, vectors):
+        # Amortised O(1) append: grow the backing buffer geometrically
+        n, k = self._n, len(vectors)
+        if n + k > len(self._buf):
+            cap = max(2 * len(self._buf), n + k)
+            buf = np.empty((cap, self.dim), dtype=np.float32)
+            norm_buf = np.empty(cap, dtype=np.float32)
+            live_buf = np.ones(cap, dtype=bool)
+            buf[:n], norm_buf[:n], live_buf[:n] = self._buf[:n], self._norm_buf[:n], self._live_buf[:n]
+            self._buf, self._norm_buf, self._live_buf = buf, norm_buf, live_buf
+        self._buf[n:n + k] = vectors
+        self._norm_buf[n:n + k] = np.einsum("ij,ij->i", vectors, vectors)
+        self._live_buf[n:n + k] = True
+        self._n = n + k
+        self.vectors, self.sq_norms, self.live = self._buf[:self._n], self._norm_buf[:self._n], self._live_buf[:self._n]
+
+    def _append_rows(self, entries, vectors):
+        for row, entry in enumerate(entries, start=self._n):
+            self._rows_by_file.setdefault(entry["filename"], []).append(row)
+        self.ids.extend(entries)
+        self._append_vectors(vectors)
+
+    def _kill(self, filename: str, rows: int) -> int:
+        """Marks the faces of `filename` among the first `rows` rows as deleted."""
+        killed = 0
+        for row in self._rows_by_file.get(filename, ()):
+            if row < rows and self.live[row]:
+                self.live[row] = False
+                killed += 1
+        self._dead += killed
+        return killed
+
+    def _rewrite(self):
+        """Writes only the live rows and bumps the generation (both locks held)."""
+        rows = np.flatnonzero(self.live)
+        tmp_vectors, tmp_ids, tmp_deleted = (p + ".tmp" for p in (self.vectors_path, self.ids_path, self.deleted_path))
+        self.vectors[rows].tofile(tmp_vectors)
+        with open(tmp_ids, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(self.ids[i]) + "\n" for i in rows)
+        open(tmp_deleted, "w").close()
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_ids, self.ids_path)
+        os.replace(tmp_deleted, self.deleted_path)
+        # Other processes see the new generation and reload instead of reading on from their offsets
+        tmp_generation = self.generation_path + ".tmp"
+        with open(tmp_generation, "w", encoding="utf-8") as f:
+            f.write(str(self.generation + 1))
+        os.replace(tmp_generation, self.generation_path)
+        self._reload()
+
+    def __len__(self):
+        return self._n - self._dead
+
+    def add(self, filename: str, vectors: np.ndarray, boxes):
+        """Append the faces of one capture."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(vectors) == 0:
+            return 0
+        entries = [{"filename": filename, "box": [int(v) for v in box]} for box in boxes]
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            # Truncating first drops the tail of an append that crashed half-way
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(self._n * self.dim * 4)
+                vectors.tofile(f)
+            data = "".join(json.dumps(e) + "\n" for e in entries).encode("utf-8")
+            with open(self.ids_path, "ab") as f:
+                f.truncate(self._ids_offset)
+                f.write(data)
+            self._ids_offset += len(data)
+            self._append_rows(entries, vectors)
+        return len(vectors)
+
+    def remove(self, filenames):
+        """Drop all faces of the given captures (tombstones; compacts when many rows are dead)."""
+        filenames = set([filenames] if isinstance(filenames, str) else filenames)
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            removed, tombstones = 0, []
+            for filename in filenames:
+                killed = self._kill(filename, self._n)
+                if killed:
+                    removed += killed
+                    tombstones.append({"filename": filename, "rows": self._n})
+            if not tombstones:
+                return 0
+            data = "".join(json.dumps(t) + "\n" for t in tombstones).encode("utf-8")
+            with open(self.deleted_path, "ab") as f:
+                f.truncate(self._deleted_offset)
+                f.write(data)
+            self._deleted_offset += len(data)
+            if self._dead >= max(COMPACT_MIN_ROWS, COMPACT_RATIO * self._n):
+                self._rewrite()
+        return removed
+
+    def compact(self):
+        """Rewrites the files without deleted rows."""
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            if self._dead:
+                self._rewrite()
+
+    def clear(self):
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            self.live[:] = False
+            self._rewrite()
+
+    def vectors_for(self, filename: str):
+        with self._lock:
+            with file_lock(self.lock_path, exclusive=False):
+                self._sync()
+            rows = [r for r in self._rows_by_file.get(filename, ()) if self.live[r]]
+            return self.vectors[rows]
+
+    # -------------------------
+    # Search
+    # -------------------------
+    def _candidates(self, query):
+        """
+        Row indices to score exactly: all rows, or approximate neighbours for
+        large indexes. Called with self._lock held.
+        """
+        n = len(self.vectors)
+        if n < APPROX_THRESHOLD or self._hnswlib is None:
+            return None
+        if self._approx is None:
+            self._approx = self._hnswlib.Index(space="l2", dim=self.dim)
+            self._approx.init_index(max_elements=2 * n, ef_construction=200, M=16)
+            self._approx.set_ef(APPROX_CANDIDATES)
+            self._approx_size = 0
+        if self._approx_size < n:
+            # Captures are append-only, so new rows are added incrementally
+            if n > self._approx.get_max_elements():
+                self._approx.resize_index(2 * n)
+            self._approx.add_items(self.vectors[self._approx_size:n], np.arange(self._approx_size, n))
+            self._approx_size = n
+        labels, _ = self._approx.knn_query(query, k=min(APPROX_CANDIDATES, n))
+        return np.unique(labels.ravel())
+
+    def search(self, query_vectors, tolerance: float = MATCH_TOLERANCE, top_k: int = 100):
+        """
+        Captures containing a face within `tolerance` of any query face.
+        Returns [{"filename", "distance"}] sorted by distance, one entry per capture.
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            with file_lock(self.lock_path, exclusive=False):
+                self._sync()
+            vectors, sq_norms, ids, live = self.vectors, self.sq_norms, self.ids, self.live.copy()
+            if len(vectors) == 0 or len(queries) == 0 or not live.any():
+                return []
+            rows = self._candidates(queries)
+        if rows is not None:
+            vectors, sq_norms, live = vectors[rows], sq_norms[rows], live[rows]
+
+        # ||v - q||^2 = ||v||^2 + ||q||^2 - 2 v.q, for every (vector, query) pair at once
+        d2 = sq_norms[:, None] + np.einsum("ij,ij->i", queries, queries)[None, :] - 2.0 * (vectors @ queries.T)
+        dist = np.sqrt(np.maximum(d2.min(axis=1), 0.0))
+        dist[~live] = np.inf  # tombstoned rows
+
+        hits = np.flatnonzero(dist <= tolerance)
+        hits = hits[np.argsort(dist[hits])]
+        best = {}
+        for h in hits:
+            row = int(rows[h]) if rows is not None else int(h)
+            filename = ids[row]["filename"]
+            if filename not in best:
+                best[filename] = float(dist[h])
+                if len(best) >= top_k:
+                    break
+        return [{"filename": f, "distance": d} for f, d in best.items()]
@@ -0,0 +1,18 @@
+# backend/gunicorn_conf.py
+"""
+Multi-worker server with model weights shared between workers.
+
+    SMILAGE_MODEL_LOAD_MODE=shared gunicorn -c gunicorn_conf.py app:app
+
+preload_app imports app.py (and so loads every model) once in the master
+process; workers are forked from it and share the weight pages copy-on-write
+instead of each loading its own copy. Check the effect with
+`python scripts/memory_report.py`.
+"""
+
+import os
+
+bind = os.environ.get("SMILAGE_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("SMILAGE_WORKERS", 2))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
@@ -0,0 +1,154 @@
+# backend/motion.py
+"""
+Motion gating and region-of-interest face detection.
+
+MotionGate compares a small blurred thumbnail of each gray frame with the
+last frame that was actually processed; when too few pixels changed, both
+over the whole frame and inside the last face boxes, the frame is "static"
+and detection/inference can be skipped. The per-face check matters: a smile
+changes well under 1% of a 640x480 frame, but several percent of the face.
+
+RoiFaceDetector runs the Haar cascade only around the last known face boxes
+and falls back to a full-frame scan on a fixed schedule, or whenever the ROI
+search comes back empty.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from smoothing import iou_matrix
+
+# -------------------------
+# Defaults
+# -------------------------
+MOTION_SIZE = (80, 60)        # Thumbnail size used for frame differencing
+MOTION_PIXEL_DELTA = 12       # Per-pixel gray change that counts as "changed"
+MOTION_MIN_CHANGED = 0.01     # Fraction of changed pixels that counts as motion
+MAX_STATIC_S = 1.0            # Force a refresh after this many seconds without one
+ROI_MARGIN = 0.5              # ROI = box grown by this fraction on every side
+FULL_SCAN_INTERVAL = 15       # Full-frame scan every N detections
+
+
+class MotionGate:
+    def __init__(self, size=MOTION_SIZE, pixel_delta: int = MOTION_PIXEL_DELTA,
+                 min_changed: float = MOTION_MIN_CHANGED, max_static_s: float = MAX_STATIC_S):
+        self.size = size
+        self.pixel_delta = pixel_delta
+        self.min_changed = min_changed
+        self.max_static_s = max_static_s
+        self.reference = None
+        self.static_frames = 0
+        self.last_changed = 1.0
+        self._last_refresh = 0.0
+
+    def _roi_changed(self, mask, shape, rois) -> float:
+        """Largest changed fraction inside the face boxes (full-frame coordinates)."""
+        sx, sy = mask.shape[1] / float(shape[1]), mask.shape[0] / float(shape[0])
+        changed = 0.0
+        for x, y, w, h in rois:
+            x1, y1 = int(x * sx), int(y * sy)
+            x2, y2 = max(x1 + 1, int(np.ceil((x + w) * sx))), max(y1 + 1, int(np.ceil((y + h) * sy)))
+            roi = mask[y1:y2, x1:x2]
+            if roi.size:
+                changed = max(changed, cv2.countNonZero(roi) / float(roi.size))
+        return changed
+
+    def update(self, gray: np.ndarray, rois=(), now: float = None) -> bool:
+        """
+        Returns True if the frame should be processed (motion or refresh due).
+        `rois` are the face boxes being tracked; change inside any of them
+        counts on its own, so small expression changes are not "static".
+        """
+        now = time.monotonic() if now is None else now
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+        small = cv2.GaussianBlur(small, (3, 3), 0)
+        if self.reference is None:
+            self.reference = small
+            self._last_refresh = now
+            return True
+
+        diff = cv2.absdiff(small, self.reference)
+        _, mask = cv2.threshold(diff, self.pixel_delta, 255, cv2.THRESH_BINARY)
+        self.last_changed = cv2.countNonZero(mask) / float(mask.size)
+        if len(rois):
+            self.last_changed = max(self.last_changed, self._roi_changed(mask, gray.shape, rois))
+
+        if self.last_changed >= self.min_changed or now - self._last_refresh >= self.max_static_s:
+            # Compare future frames against this one, so slow drift still adds up
+            self.reference = small
+            self.static_frames = 0
+            self._last_refresh = now
+            return True
+        self.static_frames += 1
+        return False
+
+    def reset(self):
+        self.reference = None
+        self.static_frames = 0
+
+
+class RoiFaceDetector:
+    def __init__(self, cascade, scale_factor: float = 1.3,
+                 min_neighbors: int = 5, margin: float = ROI_MARGIN,
+                 full_scan_interval: int = FULL_SCAN_INTERVAL):
+        self.cascade = cascade
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.margin = margin
+        self.full_scan_interval = full_scan_interval
+        self.last_boxes = np.zeros((0, 4), dtype=np.int32)
+        self.frames_since_full = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.last_scan = None       # "full" or "roi", whichever produced the last result
+
+    def _full_scan(self, gray):
+        self.full_scans += 1
+        self.frames_since_full = 0
+        self.last_scan = "full"
+        faces = self.cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors)
+        return np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+
+    def _roi_scan(self, gray, prev_boxes):
+        self.roi_scans += 1
+        self.last_scan = "roi"
+        frame_h, frame_w = gray.shape[:2]
+        found = []
+        for x, y, w, h in prev_boxes:
+            mx, my = int(w * self.margin), int(h * self.margin)
+            x1, y1 = max(0, x - mx), max(0, y - my)
+            x2, y2 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+            # Faces near the previous size only: skips most of the image pyramid
+            min_side = max(1, int(min(w, h) * 0.6))
+            faces = self.cascade.detectMultiScale(gray[y1:y2, x1:x2], self.scale_factor,
+                                                  self.min_neighbors, minSize=(min_side, min_side))
+            for fx, fy, fw, fh in faces:
+                box = np.array([fx + x1, fy + y1, fw, fh], dtype=np.int32)
+                # Overlapping ROIs can find the same face twice
+                if not found or iou_matrix([box], found).max() < 0.5:
+                    found.append(box)
+        return np.asarray(found, dtype=np.int32).reshape(-1, 4)
+
+    def detect(self, gray: np.ndarray, force_full: bool = False, scale: float = 1.0) -> np.ndarray:
+        """
+        Face boxes (N x 4, int32) for this gray frame. With scale < 1 the
+        cascade runs on a downscaled copy; boxes are always returned (and
+        remembered) in full-frame coordinates.
+        """
+        self.frames_since_full += 1
+        prev_boxes = self.last_boxes
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            prev_boxes = np.round(prev_boxes * scale).astype(np.int32)
+        if force_full or len(prev_boxes) == 0 or self.frames_since_full >= self.full_scan_interval:
+            faces = self._full_scan(gray)
+        else:
+            faces = self._roi_scan(gray, prev_boxes)
+            if len(faces) == 0:
+                faces = self._full_scan(gray)
+        if scale != 1.0:
+            faces = np.round(faces / scale).astype(np.int32)
+        self.last_boxes = faces
+        return faces
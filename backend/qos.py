@@ -0,0 +1,112 @@
+# backend/qos.py
+"""
+Load-shedding governor for the live pipeline.
+
+Each frame's processing time is compared against a per-frame budget. When
+the smoothed frame time stays over budget the governor steps one level down
+the degradation ladder; when it stays well under budget it steps back up:
+
+  0  full          - everything runs
+  1  no_age_gender - age/gender are not refreshed (the last smoothed values stay)
+  2  low_res       - face detection runs on a downscaled frame
+  3  low_emotion   - emotion inference on every EMOTION_EVERY-th due run only
+  4  low_fps       - the stream frame rate is halved
+
+Levels are cumulative: level 3 also skips age/gender and detects at low
+resolution. Hysteresis (separate degrade/restore thresholds and frame
+counts) keeps the level from oscillating. Only analysed frames should be
+recorded: undecoded or static frames cost almost nothing and would hide load.
+"""
+
+# -------------------------
+# Defaults
+# -------------------------
+LEVELS = ["full", "no_age_gender", "low_res", "low_emotion", "low_fps"]
+FRAME_BUDGET_MS = 33.0         # ~30 FPS
+EMA_ALPHA = 0.2                # Weight of the newest frame time
+RESTORE_RATIO = 0.6            # Restore only when below this fraction of the budget
+DEGRADE_FRAMES = 10            # Consecutive over-budget frames before degrading
+RESTORE_FRAMES = 60            # Consecutive frames with headroom before restoring
+LOW_RES_SCALE = 0.5            # Detection scale at level >= 2
+EMOTION_EVERY = 3              # Emotion inference interval (in due runs) at level >= 3
+LOW_FPS_FACTOR = 0.5           # Stream FPS multiplier at level 4
+
+
+class QosGovernor:
+    def __init__(self, budget_ms: float = FRAME_BUDGET_MS, alpha: float = EMA_ALPHA,
+                 restore_ratio: float = RESTORE_RATIO, degrade_frames: int = DEGRADE_FRAMES,
+                 restore_frames: int = RESTORE_FRAMES, max_level: int = len(LEVELS) - 1):
+        self.budget_ms = budget_ms
+        self.alpha = alpha
+        self.restore_ratio = restore_ratio
+        self.degrade_frames = degrade_frames
+        self.restore_frames = restore_frames
+        self.max_level = max_level
+        self.level = 0
+        self.frame_ms = 0.0        # EMA of the frame time
+        self._over = 0
+        self._under = 0
+        self._frames = 0
+        self._emotion_runs = 0
+        self.degrades = 0
+        self.restores = 0
+
+    def record(self, elapsed_ms: float) -> int:
+        """Feeds one frame time; returns the (possibly changed) level."""
+        self._frames += 1
+        if self._frames == 1:
+            self.frame_ms = elapsed_ms
+        else:
+            self.frame_ms += self.alpha * (elapsed_ms - self.frame_ms)
+
+        if self.frame_ms > self.budget_ms:
+            self._over, self._under = self._over + 1, 0
+        elif self.frame_ms < self.budget_ms * self.restore_ratio:
+            self._over, self._under = 0, self._under + 1
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.degrade_frames and self.level < self.max_level:
+            self.level += 1
+            self.degrades += 1
+            self._over = 0
+        elif self._under >= self.restore_frames and self.level > 0:
+            self.level -= 1
+            self.restores += 1
+            self._under = 0
+        return self.level
+
+    # -------------------------
+    # Per-stage decisions
+    # -------------------------
+    @property
+    def refresh_age_gender(self) -> bool:
+        return self.level < 1
+
+    @property
+    def detect_scale(self) -> float:
+        return LOW_RES_SCALE if self.level >= 2 else 1.0
+
+    def run_emotion(self) -> bool:
+        """
+        Called once per due emotion run; at level >= 3 only every
+        EMOTION_EVERY-th call returns True. Counting calls rather than frame
+        indices keeps the cadence independent of which frames get analysed.
+        """
+        if self.level < 3:
+            return True
+        self._emotion_runs += 1
+        return self._emotion_runs % EMOTION_EVERY == 1
+
+    def stream_fps(self, fps: float) -> float:
+        return fps * LOW_FPS_FACTOR if self.level >= 4 else fps
+
+    def stats(self) -> dict:
+        return {
+            "level": self.level,
+            "name": LEVELS[self.level],
+            "frame_ms": round(self.frame_ms, 2),
+            "budget_ms": self.budget_ms,
+            "degrades": self.degrades,
+            "restores": self.restores,
+        }
@@ -0,0 +1,89 @@
+# backend/quality.py
+"""
+Per-face image quality metrics (sharpness, exposure, face size).
+
+All metrics are computed from the grayscale frame that was already produced
+for face detection, so no extra colour conversion is needed per face.
+"""
+
+import cv2
+import numpy as np
+
+# -------------------------
+# Defaults
+# -------------------------
+BLUR_THRESHOLD = 100.0       # Laplacian variance below this => blurry
+DARK_THRESHOLD = 60.0        # Mean luminance below this => under-exposed
+BRIGHT_THRESHOLD = 200.0     # Mean luminance above this => over-exposed
+MIN_CONTRAST = 20.0          # Luminance std-dev below this => flat / washed out
+MIN_FACE_RATIO = 0.02        # Face area / frame area below this => too small
+
+
+def face_sharpness(gray: np.ndarray, box):
+    """
+    Laplacian variance of a face ROI (same scale as BLUR_THRESHOLD).
+    The ROI is measured at capture resolution, since that is the image that
+    gets saved: downscaling it first would hide blur on close-up faces. The
+    Laplacian runs with an integer kernel into a 16-bit buffer, so no
+    float64 image is allocated.
+    """
+    x, y, w, h = (int(v) for v in box)
+    roi = gray[y:y+h, x:x+w]
+    if roi.size == 0:
+        return 0.0
+    lap = cv2.Laplacian(roi, cv2.CV_16S, ksize=1)
+    _, std = cv2.meanStdDev(lap)
+    return float(std[0, 0] ** 2)
+
+
+def compute_face_metrics(gray: np.ndarray, faces):
+    """
+    Quality metrics for every face box in one frame.
+
+    Exposure (mean luminance) and contrast (luminance std-dev) come from one
+    meanStdDev pass over each face crop; nothing frame-sized is allocated.
+    Returns a dict of float32 arrays, one entry per face, in input order.
+    """
+    boxes = np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+    n = len(boxes)
+    frame_h, frame_w = gray.shape[:2]
+    sharpness = np.zeros(n, dtype=np.float32)
+    brightness = np.zeros(n, dtype=np.float32)
+    contrast = np.zeros(n, dtype=np.float32)
+    size_ratio = np.zeros(n, dtype=np.float32)
+
+    for i, (x, y, w, h) in enumerate(boxes):
+        x1, y1 = max(0, int(x)), max(0, int(y))
+        x2, y2 = min(frame_w, int(x + w)), min(frame_h, int(y + h))
+        roi = gray[y1:y2, x1:x2]
+        if roi.size == 0:
+            continue
+        mean, std = cv2.meanStdDev(roi)
+        brightness[i] = mean[0, 0]
+        contrast[i] = std[0, 0]
+        size_ratio[i] = roi.size / float(frame_w * frame_h)
+        sharpness[i] = face_sharpness(gray, (x1, y1, x2 - x1, y2 - y1))
+
+    return {
+        "sharpness": sharpness,
+        "brightness": brightness,
+        "contrast": contrast,
+        "size_ratio": size_ratio,
+    }
+
+
+def quality_flags(metrics: dict, blur_threshold: float = BLUR_THRESHOLD):
+    """Boolean arrays derived from `compute_face_metrics`, plus an overall `is_ok`."""
+    is_blurry = metrics["sharpness"] < blur_threshold
+    is_dark = metrics["brightness"] < DARK_THRESHOLD
+    is_bright = metrics["brightness"] > BRIGHT_THRESHOLD
+    is_flat = metrics["contrast"] < MIN_CONTRAST
+    is_small = metrics["size_ratio"] < MIN_FACE_RATIO
+    return {
+        "is_blurry": is_blurry,
+        "is_dark": is_dark,
+        "is_bright": is_bright,
+        "is_flat": is_flat,
+        "is_small": is_small,
+        "is_ok": ~(is_blurry | is_dark | is_bright | is_flat | is_small),
+    }
@@ -0,0 +1,163 @@
+# backend/result_cache.py
+"""
+LRU/TTL cache of model results keyed by a perceptual hash of the face crop.
+
+With a fixed camera a still face produces nearly identical crops for many
+consecutive frames. A 64-bit difference hash (dHash) of a 9x8 gray thumbnail
+is cheap to compute and changes little between such crops, so results are
+reused when a cached hash is within `tolerance` bits (Hamming distance).
+"""
+
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# -------------------------
+# Defaults
+# -------------------------
+CACHE_SIZE = 256          # Max cached crops
+CACHE_TTL = 2.0           # Seconds before an entry is considered stale
+HAMMING_TOLERANCE = 4     # Max differing hash bits for a hit (0 = exact match only)
+
+
+def dhash(img: np.ndarray, hash_size: int = 8) -> int:
+    """64-bit difference hash (for hash_size=8) of a BGR or gray image."""
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(img, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ResultCache:
+    """
+    LRU cache with per-entry TTL and near-match lookup.
+    Exact hashes are found in O(1); near matches scan the (bounded) cache.
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = CACHE_TTL,
+                 tolerance: int = HAMMING_TOLERANCE):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self._entries = OrderedDict()  # hash -> (timestamp, value)
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key: int):
+        if key in self._entries:
+            return key
+        if self.tolerance <= 0:
+            return None
+        best, best_dist = None, self.tolerance + 1
+        for k in self._entries:
+            d = hamming(k, key)
+            if d < best_dist:
+                best, best_dist = k, d
+        return best
+
+    def get(self, key: int):
+        return self.get_item(key)[1]
+
+    def get_item(self, key: int):
+        """(stored key, value) of the exact or nearest live entry, or (None, None)."""
+        now = time.monotonic()
+        found = self._lookup(key)
+        if found is not None:
+            ts, value = self._entries[found]
+            if now - ts <= self.ttl:
+                self._entries.move_to_end(found)
+                self.hits += 1
+                if found != key:
+                    self.near_hits += 1
+                return found, value
+            del self._entries[found]
+            self.expirations += 1
+        self.misses += 1
+        return None, None
+
+    def put(self, key: int, value):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / total if total else 0.0,
+            "tolerance": self.tolerance,
+            "ttl": self.ttl,
+        }
+
+
+class CachedModelManager:
+    """
+    Wraps a ModelManager; `predict_proba_all` runs the model stack only on a
+    cache miss. Switching the active model clears the cache. Everything else
+    is delegated to the wrapped manager.
+    """
+
+    def __init__(self, manager, cache: ResultCache = None):
+        self.manager = manager
+        self.cache = cache or ResultCache()
+
+    def __getattr__(self, name):
+        return getattr(self.manager, name)
+
+    def predict_proba_all(self, face_img: np.ndarray, age_gender: bool = True) -> dict:
+        """
+        With age_gender=False only the emotion model runs on a miss (age/gender
+        are None). A hit on such an entry with age_gender=True runs the missing
+        models and updates the entry, instead of returning None for them.
+        """
+        key = dhash(face_img)
+        found, result = self.cache.get_item(key)
+        if result is None:
+            result = {
+                "emotion": self.manager.predict_emotion_proba(face_img),
+                "age": self.manager.predict_age_proba(face_img) if age_gender else None,
+                "gender": self.manager.predict_gender_proba(face_img) if age_gender else None,
+            }
+            if any(v is not None for v in result.values()):
+                self.cache.put(key, result)
+        elif age_gender and ((result["age"] is None and self.manager.active_age) or
+                             (result["gender"] is None and self.manager.active_gender)):
+            result = dict(result)
+            if result["age"] is None:
+                result["age"] = self.manager.predict_age_proba(face_img)
+            if result["gender"] is None:
+                result["gender"] = self.manager.predict_gender_proba(face_img)
+            self.cache.put(found, result)  # the matched slot, so the partial entry is not hit again
+        return result
+
+    def switch_emotion_model(self, key: str):
+        self.cache.clear()
+        return self.manager.switch_emotion_model(key)
+
+    def switch_age_model(self, key: str):
+        self.cache.clear()
+        return self.manager.switch_age_model(key)
+
+    def switch_gender_model(self, key: str):
+        self.cache.clear()
+        return self.manager.switch_gender_model(key)
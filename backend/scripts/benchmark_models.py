@@ -1,3 +1,4 @@
+import argparse
 import cv2
 import time
 import psutil
@@ -6,6 +7,8 @@ import sys, os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from wrapper import ModelManager, EmotionFERPlus, AgeCaffeNet, GenderCaffeNet
+from smile_gate import SmileCascade, SmileGate
+from tracing import tracer
 
 def benchmark(num_frames=50):
     """
@@ -44,9 +47,11 @@ def benchmark(num_frames=50):
     print(f"[INFO] Running benchmark for {num_frames} frames...")
 
     while frame_count < num_frames:
+        frame_t0 = tracer.now()
         ret, frame = cap.read()
         if not ret:
             continue
+        tracer.complete("capture", frame_t0)
 
         face_box = (0, 0, frame.shape[1], frame.shape[0])  # full frame for demo
 
@@ -75,6 +80,7 @@ def benchmark(num_frames=50):
         cpu_usages.append(psutil.cpu_percent(interval=None))
         memory_usages.append(psutil.virtual_memory().percent)
 
+        tracer.complete("frame", frame_t0, cat="frame", frame=frame_count)
         frame_count += 1
 
     cap.release()
@@ -105,8 +111,103 @@ def benchmark(num_frames=50):
 
     return results
 
+def benchmark_smile_prefilter(num_frames=300, source=0, smile_threshold=0.7, refresh_interval=15):
+    """
+    Compares the Haar smile cascade against FER+ on every detected face.
+    FER+ (happiness >= smile_threshold) is the reference:
+      - false negative = FER+ sees a smile, the cascade does not
+      - gated miss     = a FER+ smile on a frame the SmileGate would have skipped
+                         (i.e. what the two-stage trigger actually loses)
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        print(f"(!) Could not open video source {source}.")
+        return
+
+    emotion_model = EmotionFERPlus("models/emotion-ferplus.onnx")
+    smile_index = emotion_model.labels.index("happiness")
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    smile_cascade = SmileCascade()
+    gate = SmileGate(smile_cascade, refresh_interval=refresh_interval)
+
+    counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0, "gated_misses": 0}
+    timings = {"cascade": [], "ferplus": []}
+    frame_count = 0
+    print(f"[INFO] Running smile pre-filter benchmark for {num_frames} frames...")
+
+    while frame_count < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            if isinstance(source, str):
+                break  # end of video file
+            continue
+        frame_count += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        with tracer.span("detect"):
+            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        # Single-guest kiosk: the largest face is track 0
+        if len(faces) == 0:
+            continue
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+
+        start = time.perf_counter()
+        with tracer.span("smile_cascade", cat="model"):
+            cascade_hit = smile_cascade.detect(gray, (x, y, w, h))
+        timings["cascade"].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with tracer.span("emotion", cat="model"):
+            probs = emotion_model.predict_proba(frame[y:y+h, x:x+w])
+        timings["ferplus"].append((time.perf_counter() - start) * 1000)
+        fer_smile = float(probs[smile_index]) >= smile_threshold
+
+        would_run = gate.should_run(0, gray, (x, y, w, h))
+        if fer_smile and not would_run:
+            counts["gated_misses"] += 1
+        key = ("t" if cascade_hit == fer_smile else "f") + ("p" if cascade_hit else "n")
+        counts[key] += 1
+
+    cap.release()
+
+    faces_seen = sum(counts[k] for k in ("tp", "fp", "fn", "tn"))
+    fer_smiles = counts["tp"] + counts["fn"]
+    fer_neutral = counts["fp"] + counts["tn"]
+    return {
+        "faces_evaluated": faces_seen,
+        "fer_smiles": fer_smiles,
+        "cascade_false_negative_rate": counts["fn"] / fer_smiles if fer_smiles else 0,
+        "cascade_false_positive_rate": counts["fp"] / fer_neutral if fer_neutral else 0,
+        "gated_miss_rate": counts["gated_misses"] / fer_smiles if fer_smiles else 0,
+        "fer_runs_fraction": gate.stats()["fer_rate"],
+        "avg_cascade_time_ms": np.mean(timings["cascade"]) if timings["cascade"] else 0,
+        "avg_ferplus_time_ms": np.mean(timings["ferplus"]) if timings["ferplus"] else 0,
+    }
+
+
 if __name__ == "__main__":
-    results = benchmark(num_frames=30)
+    parser = argparse.ArgumentParser(description="Model benchmarks")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--smile-prefilter", action="store_true",
+                        help="Measure the smile cascade pre-filter against FER+ instead")
+    parser.add_argument("--source", default="0", help="Camera index or video file (pre-filter benchmark)")
+    parser.add_argument("--smile-threshold", type=float, default=0.7)
+    parser.add_argument("--refresh-interval", type=int, default=15)
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record per-frame/per-stage spans and write them as Chrome trace JSON")
+    args = parser.parse_args()
+
+    if args.trace:
+        tracer.start()
+
+    if args.smile_prefilter:
+        source = int(args.source) if args.source.isdigit() else args.source
+        results = benchmark_smile_prefilter(args.frames, source, args.smile_threshold, args.refresh_interval)
+    else:
+        results = benchmark(num_frames=args.frames)
     print("\n[INFO] Benchmark completed.")
-    for k, v in results.items():
-        print(f"{k}: {v:.2f}")
\ No newline at end of file
+    for k, v in (results or {}).items():
+        print(f"{k}: {v:.2f}")
+    if args.trace:
+        tracer.stop()
+        spans = tracer.save(args.trace)
+        print(f"[INFO] {spans} spans written to {args.trace} (open in https://ui.perfetto.dev)")
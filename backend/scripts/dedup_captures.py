@@ -0,0 +1,127 @@
+# dedup_captures.py
+"""
+Bulk near-duplicate removal for an existing captures folder.
+
+Uses the signatures stored in the capture index (index/captures.jsonl) and
+computes them for images that are not indexed yet (largest Haar face,
+file modification time). Captures taken within --window seconds of each
+other whose signatures match (see dedup.is_near_duplicate) form a group;
+the sharpest capture of each group is kept.
+
+Dry run by default; --apply deletes the duplicates (and their index
+entries), --move-to DIR moves them there instead.
+
+Usage (from backend/):
+    python scripts/dedup_captures.py
+    python scripts/dedup_captures.py --apply
+    python scripts/dedup_captures.py path/to/folder --window 300 --move-to duplicates/
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dedup import DEDUP_WINDOW_S, CaptureIndex, capture_signature, is_near_duplicate
+from face_index import FaceIndex
+from quality import face_sharpness
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def compute_entry(path: str, face_cascade) -> dict:
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return None
+    faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+    box = max(faces, key=lambda f: f[2] * f[3]) if len(faces) else (0, 0, gray.shape[1], gray.shape[0])
+    signature = capture_signature(gray, box if len(faces) else None)
+    return {"filename": os.path.basename(path), "frame": signature["frame"], "face": signature["face"],
+            "sharpness": round(face_sharpness(gray, box), 2), "track": None,
+            "time": os.path.getmtime(path)}
+
+
+def group_duplicates(entries, window_s: float = DEDUP_WINDOW_S):
+    """Groups of near-duplicate entries (lists), in time order; singletons included."""
+    groups = []
+    for entry in sorted(entries, key=lambda e: e["time"]):
+        for group in reversed(groups):
+            first = group[0]
+            # Groups are ordered by their first capture: older ones are out of the window too
+            if entry["time"] - first["time"] > window_s:
+                break
+            same_track = entry["track"] is not None and entry["track"] == first["track"]
+            if is_near_duplicate(entry, first, same_track):
+                group.append(entry)
+                break
+        else:
+            groups.append([entry])
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove near-duplicate captures")
+    parser.add_argument("folder", nargs="?", default=os.path.join(BACKEND_DIR, "captures"))
+    parser.add_argument("--index-dir", default=os.path.join(BACKEND_DIR, "index"))
+    parser.add_argument("--window", type=float, default=DEDUP_WINDOW_S, help="seconds")
+    parser.add_argument("--apply", action="store_true", help="Delete duplicates (default: dry run)")
+    parser.add_argument("--move-to", help="Move duplicates to this folder instead of deleting")
+    args = parser.parse_args()
+
+    capture_index = CaptureIndex(args.index_dir)
+    indexed = {e["filename"]: e for e in capture_index.entries}
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+    entries, computed = [], 0
+    for name in sorted(os.listdir(args.folder)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        entry = indexed.get(name)
+        if entry is None:
+            entry = compute_entry(os.path.join(args.folder, name), face_cascade)
+            if entry is None:
+                print(f"[WARN] Could not read {name}")
+                continue
+            capture_index.add(entry)  # signatures are kept for the next run
+            computed += 1
+        entries.append(entry)
+    print(f"[INFO] {len(entries)} captures ({computed} newly indexed)")
+
+    groups = [g for g in group_duplicates(entries, args.window) if len(g) > 1]
+    duplicates = []
+    for group in groups:
+        keep = max(group, key=lambda e: e["sharpness"])
+        drop = [e["filename"] for e in group if e is not keep]
+        duplicates.extend(drop)
+        print(f"  keep {keep['filename']} (sharpness {keep['sharpness']:.0f}), drop {', '.join(drop)}")
+    print(f"[INFO] {len(groups)} duplicate groups, {len(duplicates)} duplicates")
+
+    if not duplicates:
+        return
+    if not (args.apply or args.move_to):
+        print("[INFO] Dry run: pass --apply or --move-to DIR to remove them.")
+        return
+
+    if args.move_to:
+        os.makedirs(args.move_to, exist_ok=True)
+    for name in duplicates:
+        path = os.path.join(args.folder, name)
+        if args.move_to:
+            shutil.move(path, os.path.join(args.move_to, name))
+        else:
+            os.remove(path)
+    capture_index.remove(duplicates)
+    capture_index.compact()
+    if os.path.exists(os.path.join(args.index_dir, "embeddings.f32")):
+        face_index = FaceIndex(args.index_dir)
+        face_index.remove(duplicates)
+        face_index.compact()
+    print(f"[INFO] {'Moved' if args.move_to else 'Deleted'} {len(duplicates)} duplicates.")
+
+
+if __name__ == "__main__":
+    main()
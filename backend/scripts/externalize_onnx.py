@@ -0,0 +1,39 @@
+# externalize_onnx.py
+"""
+Re-save an ONNX model with its weights in a separate external-data file.
+
+onnxruntime memory-maps external-data initializers instead of copying them
+into the process heap, so with SMILAGE_MODEL_LOAD_MODE=shared every worker
+process reads the same page-cache pages for the weights.
+
+Usage (from backend/, needs `pip install onnx`):
+    python scripts/externalize_onnx.py models/emotion-ferplus.onnx
+    # -> models/emotion-ferplus.onnx rewritten, weights in models/emotion-ferplus.onnx.data
+"""
+
+import argparse
+import os
+
+
+def externalize(model_path: str, output_path: str = None, size_threshold: int = 1024):
+    import onnx
+
+    output_path = output_path or model_path
+    model = onnx.load(model_path)
+    location = os.path.basename(output_path) + ".data"
+    onnx.save_model(model, output_path, save_as_external_data=True,
+                    all_tensors_to_one_file=True, location=location,
+                    size_threshold=size_threshold)
+    data_path = os.path.join(os.path.dirname(output_path), location)
+    print(f"[INFO] Saved {output_path} ({os.path.getsize(output_path) / 1024:.1f} KiB graph, "
+          f"{os.path.getsize(data_path) / 2**20:.1f} MiB weights in {location})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move ONNX weights to an external-data file")
+    parser.add_argument("model")
+    parser.add_argument("--output", default=None, help="defaults to rewriting the input in place")
+    parser.add_argument("--size-threshold", type=int, default=1024,
+                        help="tensors smaller than this (bytes) stay inline")
+    args = parser.parse_args()
+    externalize(args.model, args.output, args.size_threshold)
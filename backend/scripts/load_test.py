@@ -0,0 +1,180 @@
+# load_test.py
+"""
+Headless WebSocket load generator for /ws/video.
+
+Opens N concurrent sessions, each behaving like a browser that only
+watches, and measures per message:
+  - end-to-end latency: payload "ts" (server capture time) -> client receive
+  - delivered FPS per session
+  - message size (JSON + base64 frame, or codec packets + metadata)
+
+In ramp mode the client count grows step by step until the latency SLO
+or the FPS floor is broken, which gives the capacity of the host.
+
+The server must replay a recorded session so every client gets frames
+without a real camera (see scripts/record_session.py):
+    SMILAGE_REPLAY=sessions/kiosk1 uvicorn app:app
+
+Latency compares server and client wall clocks: run the load generator on
+the same host, or on a machine with a synchronised clock.
+
+Usage (from backend/):
+    python scripts/load_test.py --clients 4 --duration 20
+    python scripts/load_test.py --ramp --start 1 --step 2 --max 32 --slo-p95-ms 150 --min-fps 15
+    python scripts/load_test.py --codec h264 --clients 8
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+try:
+    import websockets
+except ImportError:  # installed with uvicorn[standard]
+    websockets = None
+
+# -------------------------
+# Defaults
+# -------------------------
+DEFAULT_URL = "ws://127.0.0.1:8000/ws/video"
+SLO_P95_MS = 150.0
+MIN_FPS = 15.0
+
+
+class ClientStats:
+    __slots__ = ("latencies_ms", "sizes", "frames", "errors")
+
+    def __init__(self):
+        self.latencies_ms = []
+        self.sizes = []
+        self.frames = 0
+        self.errors = 0
+
+
+async def run_client(url: str, duration: float, warmup: float, stats: ClientStats):
+    """One viewer session; only messages after `warmup` seconds are counted."""
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            start = time.monotonic()
+            pending = 0   # codec mode: packet bytes belonging to the next metadata message
+            while True:
+                remaining = start + warmup + duration - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    return
+                received = time.time()
+                counting = time.monotonic() - start >= warmup
+                if isinstance(message, bytes):
+                    pending += len(message)
+                    continue
+                data = json.loads(message)
+                if "ts" not in data:
+                    continue  # benchmark progress etc.
+                if counting:
+                    stats.latencies_ms.append((received - data["ts"]) * 1000.0)
+                    stats.sizes.append(len(message) + pending)
+                    stats.frames += 1
+                pending = 0
+    except Exception as e:
+        stats.errors += 1
+        print(f"[WARN] Client failed: {e}")
+
+
+async def run_step(url: str, clients: int, duration: float, warmup: float) -> dict:
+    all_stats = [ClientStats() for _ in range(clients)]
+    await asyncio.gather(*(run_client(url, duration, warmup, s) for s in all_stats))
+
+    latencies = np.array([v for s in all_stats for v in s.latencies_ms], dtype=np.float64)
+    sizes = np.array([v for s in all_stats for v in s.sizes], dtype=np.float64)
+    fps = np.array([s.frames / duration for s in all_stats], dtype=np.float64)
+    result = {
+        "clients": clients,
+        "messages": int(latencies.size),
+        "errors": sum(s.errors for s in all_stats),
+        "fps_mean": float(fps.mean()) if fps.size else 0.0,
+        "fps_min": float(fps.min()) if fps.size else 0.0,
+        "msg_kb_mean": float(sizes.mean() / 1024) if sizes.size else 0.0,
+        "throughput_mbit": float(sizes.sum() * 8 / duration / 1e6),
+    }
+    for p in (50, 95, 99):
+        result[f"latency_p{p}_ms"] = float(np.percentile(latencies, p)) if latencies.size else float("inf")
+    result["latency_max_ms"] = float(latencies.max()) if latencies.size else float("inf")
+    return result
+
+
+def print_row(r: dict, header: bool = False):
+    if header:
+        print(f"{'clients':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+              f"{'FPS avg':>8} {'FPS min':>8} {'msg KiB':>8} {'Mbit/s':>7} {'errors':>6}")
+    print(f"{r['clients']:>7} {r['latency_p50_ms']:8.1f} {r['latency_p95_ms']:8.1f} {r['latency_p99_ms']:8.1f} "
+          f"{r['latency_max_ms']:8.1f} {r['fps_mean']:8.1f} {r['fps_min']:8.1f} {r['msg_kb_mean']:8.1f} "
+          f"{r['throughput_mbit']:7.1f} {r['errors']:>6}")
+
+
+def within_slo(r: dict, slo_p95_ms: float, min_fps: float) -> bool:
+    return r["errors"] == 0 and r["latency_p95_ms"] <= slo_p95_ms and r["fps_min"] >= min_fps
+
+
+async def ramp(url, start, step, max_clients, duration, warmup, slo_p95_ms, min_fps):
+    results, capacity = [], 0
+    clients = start
+    while clients <= max_clients:
+        r = await run_step(url, clients, duration, warmup)
+        print_row(r, header=not results)
+        results.append(r)
+        if not within_slo(r, slo_p95_ms, min_fps):
+            break
+        capacity = clients
+        clients += step
+    return results, capacity
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket load generator for /ws/video")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--codec", choices=["h264", "vp8"], help="Use video-codec streaming")
+    parser.add_argument("--clients", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=15.0, help="Measured seconds per step")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds ignored at session start")
+    parser.add_argument("--ramp", action="store_true", help="Increase clients until the SLO breaks")
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--max", type=int, default=64)
+    parser.add_argument("--slo-p95-ms", type=float, default=SLO_P95_MS)
+    parser.add_argument("--min-fps", type=float, default=MIN_FPS)
+    parser.add_argument("--json", help="Write all step results to this file")
+    args = parser.parse_args()
+
+    if websockets is None:
+        print("[ERROR] The 'websockets' package is required (pip install websockets).")
+        return
+    url = f"{args.url}?codec={args.codec}" if args.codec else args.url
+
+    print(f"\n========== LOAD TEST: {url} ==========")
+    if args.ramp:
+        results, capacity = asyncio.run(ramp(url, args.start, args.step, args.max, args.duration,
+                                             args.warmup, args.slo_p95_ms, args.min_fps))
+        print("-" * 86)
+        print(f"SLO: p95 <= {args.slo_p95_ms:.0f} ms, FPS >= {args.min_fps:.0f} per client")
+        if capacity:
+            print(f"[INFO] Capacity: {capacity} concurrent clients within SLO.")
+        else:
+            print("[WARN] SLO broken at the first step.")
+    else:
+        results = [asyncio.run(run_step(url, args.clients, args.duration, args.warmup))]
+        print_row(results[0], header=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# memory_report.py
+"""
+Per-process unique vs shared memory for the server workers.
+
+For every matching process it prints:
+  RSS    - resident pages, shared ones counted in full
+  USS    - pages only this process has (what a new worker would really cost)
+  PSS    - shared pages split evenly between the processes that map them
+  Shared - RSS - USS
+
+With SMILAGE_MODEL_LOAD_MODE=shared and gunicorn_conf.py (preload) most of
+the model weights should move from USS to Shared.
+
+Usage:
+    python scripts/memory_report.py                 # uvicorn / gunicorn processes
+    python scripts/memory_report.py --match app:app
+    python scripts/memory_report.py --pids 1234 1235
+"""
+
+import argparse
+
+import psutil
+
+MB = 2 ** 20
+
+
+def find_processes(match=("uvicorn", "gunicorn"), pids=None):
+    if pids:
+        return [psutil.Process(pid) for pid in pids]
+    procs = []
+    for proc in psutil.process_iter(["pid", "cmdline"]):
+        cmdline = " ".join(proc.info["cmdline"] or [])
+        if any(m in cmdline for m in match) and "memory_report" not in cmdline:
+            procs.append(proc)
+    return procs
+
+
+def memory_report(procs):
+    rows = []
+    for proc in procs:
+        try:
+            info = proc.memory_full_info()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        pss = getattr(info, "pss", None)   # Linux only
+        rows.append({
+            "pid": proc.pid,
+            "rss_mb": info.rss / MB,
+            "uss_mb": info.uss / MB,
+            "pss_mb": pss / MB if pss is not None else None,
+            "shared_mb": (info.rss - info.uss) / MB,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Unique vs shared memory per worker process")
+    parser.add_argument("--match", nargs="+", default=["uvicorn", "gunicorn"])
+    parser.add_argument("--pids", nargs="+", type=int)
+    args = parser.parse_args()
+
+    rows = memory_report(find_processes(args.match, args.pids))
+    if not rows:
+        print("[WARN] No matching processes found.")
+        return
+
+    print("\n========== WORKER MEMORY REPORT ==========")
+    print(f"{'PID':>8} {'RSS MiB':>10} {'USS MiB':>10} {'PSS MiB':>10} {'Shared MiB':>11}")
+    for r in rows:
+        pss = f"{r['pss_mb']:10.1f}" if r["pss_mb"] is not None else f"{'-':>10}"
+        print(f"{r['pid']:>8} {r['rss_mb']:10.1f} {r['uss_mb']:10.1f} {pss} {r['shared_mb']:11.1f}")
+
+    total_rss = sum(r["rss_mb"] for r in rows)
+    total_uss = sum(r["uss_mb"] for r in rows)
+    avg_uss = total_uss / len(rows)
+    print("------------------------------------------")
+    print(f"Processes        : {len(rows)}")
+    print(f"Sum of RSS       : {total_rss:.1f} MiB (double-counts shared pages)")
+    print(f"Sum of USS       : {total_uss:.1f} MiB")
+    if all(r["pss_mb"] is not None for r in rows):
+        print(f"Sum of PSS       : {sum(r['pss_mb'] for r in rows):.1f} MiB (actual footprint)")
+    available = psutil.virtual_memory().available / MB
+    print(f"Avg USS / worker : {avg_uss:.1f} MiB")
+    print(f"Available memory : {available:.1f} MiB -> room for ~{int(available // avg_uss) if avg_uss else 0} more workers")
+    print("==========================================")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# microbench_wrapper.py
+"""
+Latency and allocation micro-benchmarks for the wrapper.py hot paths.
+
+Every preprocess / predict / post-process function runs on synthetic face
+crops of several sizes. For each function and size it reports:
+  - per-call latency distribution (p50 / p95 / p99 / max, microseconds)
+  - peak bytes: extra traced memory at the high-water mark of one call,
+    i.e. all temporaries that are alive at the same time (tracemalloc;
+    numpy and cv2 output arrays are traced)
+  - retained bytes: memory still held after the call (the result)
+and, for the whole run, the largest single-call peak over all cases and
+the resident memory.
+
+Model forward passes are only measured when the model files are present;
+the preprocess and post-process functions need no weights.
+
+With --baseline, allocation growth beyond --alloc-tolerance fails the run
+(exit status 1). Latency is machine-dependent, so latency regressions only
+warn unless --fail-on-latency is given.
+
+Usage (from backend/):
+    python scripts/microbench_wrapper.py
+    python scripts/microbench_wrapper.py --baseline scripts/microbench_baseline.json
+    python scripts/microbench_wrapper.py --save-baseline scripts/microbench_baseline.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wrapper import AgeCaffeNet, EmotionFERPlus, GenderCaffeNet, Prediction, softmax
+
+# -------------------------
+# Defaults
+# -------------------------
+CROP_SIZES = [48, 96, 160, 240, 320]
+LATENCY_CALLS = 300
+ALLOC_CALLS = 20
+WARMUP_CALLS = 10
+ALLOC_TOLERANCE = 0.10         # Allowed relative growth of peak / retained bytes
+ALLOC_SLACK_BYTES = 512        # Absolute slack for tiny allocations
+LATENCY_TOLERANCE = 0.50       # Allowed relative growth of p50 latency
+
+
+def synthetic_face(size: int, seed: int = 0) -> np.ndarray:
+    """Deterministic BGR crop: smooth gradient plus noise (size x size x 3, uint8)."""
+    rng = np.random.default_rng(seed + size)
+    yy, xx = np.mgrid[0:size, 0:size].astype(np.float32) / max(size - 1, 1)
+    base = 80 + 100 * (0.6 * xx + 0.4 * yy)
+    img = base[:, :, None] + np.array([0, 10, 25], dtype=np.float32) + rng.normal(0, 12, (size, size, 3))
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def _bare(cls):
+    # Preprocess / post-process do not touch the network: skip load() so they
+    # can be measured without the model weights.
+    return cls.__new__(cls)
+
+
+def _load(factory):
+    try:
+        return factory()
+    except Exception as e:
+        print(f"[WARN] {e} (forward pass not measured)")
+        return None
+
+
+def build_cases():
+    """name -> (function of one face crop, sizes). Crop-independent cases use size 0."""
+    fer, age, gender = _bare(EmotionFERPlus), _bare(AgeCaffeNet), _bare(GenderCaffeNet)
+    scores = np.random.default_rng(0).normal(0, 3, 8).astype(np.float32)
+    labels = EmotionFERPlus.DEFAULT_EMOTIONS
+
+    def postprocess(_):
+        prob = softmax(scores.copy())
+        idx = int(np.argmax(prob))
+        return Prediction(labels[idx], float(prob[idx]), prob, 0.0)
+
+    cases = {
+        "ferplus.preprocess": (fer.preprocess, CROP_SIZES),
+        "age.preprocess": (age.preprocess, CROP_SIZES),
+        "gender.preprocess": (gender.preprocess, CROP_SIZES),
+        "softmax": (lambda _: softmax(scores.copy()), [0]),
+        "postprocess": (postprocess, [0]),
+    }
+
+    loaded_fer = _load(lambda: EmotionFERPlus("models/emotion-ferplus.onnx"))
+    loaded_age = _load(lambda: AgeCaffeNet("models/age_deploy.prototxt", "models/age_net.caffemodel"))
+    loaded_gender = _load(lambda: GenderCaffeNet("models/gender_deploy.prototxt", "models/gender_net.caffemodel"))
+    for name, model in (("ferplus", loaded_fer), ("age", loaded_age), ("gender", loaded_gender)):
+        if model is not None:
+            cases[f"{name}.predict_proba"] = (model.predict_proba, CROP_SIZES)
+            cases[f"{name}.predict"] = (model.predict, CROP_SIZES)
+    return cases
+
+
+def measure_latency(fn, img, calls: int = LATENCY_CALLS) -> dict:
+    for _ in range(WARMUP_CALLS):
+        fn(img)
+    samples = np.empty(calls, dtype=np.float64)
+    for i in range(calls):
+        t0 = time.perf_counter_ns()
+        fn(img)
+        samples[i] = (time.perf_counter_ns() - t0) / 1000.0
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50_us": float(p50), "p95_us": float(p95), "p99_us": float(p99),
+            "max_us": float(samples.max()), "mean_us": float(samples.mean())}
+
+
+def measure_allocations(fn, img, calls: int = ALLOC_CALLS) -> dict:
+    """Median and max per-call peak, median retained bytes (tracemalloc must be running)."""
+    fn(img)  # first-call caches are not per-call allocations
+    peaks, retained = [], []
+    for _ in range(calls):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn(img)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained.append(current - before)
+        del result
+    return {"peak_bytes": int(np.median(peaks)), "max_peak_bytes": int(max(peaks)),
+            "retained_bytes": int(np.median(retained))}
+
+
+def run(cases) -> dict:
+    results = {}
+    for name, (fn, sizes) in cases.items():
+        for size in sizes:
+            img = synthetic_face(size if size else 96)
+            key = f"{name}@{size}" if size else name
+            results[key] = measure_latency(fn, img)
+
+    tracemalloc.start()
+    for name, (fn, sizes) in cases.items():
+        for size in sizes:
+            img = synthetic_face(size if size else 96)
+            key = f"{name}@{size}" if size else name
+            results[key].update(measure_allocations(fn, img))
+    tracemalloc.stop()
+    # reset_peak() runs before every call, so the tracer's own peak covers only the last one
+    suite_peak = max(r["max_peak_bytes"] for r in results.values())
+
+    return {
+        "cases": results,
+        "suite": {"traced_peak_bytes": suite_peak, "rss_bytes": psutil.Process().memory_info().rss},
+    }
+
+
+def compare(results: dict, baseline: dict, alloc_tolerance: float, latency_tolerance: float):
+    """Returns (allocation failures, latency warnings) as lists of messages."""
+    failures, warnings = [], []
+    for key, base in baseline.get("cases", {}).items():
+        cur = results["cases"].get(key)
+        if cur is None:
+            continue
+        for metric in ("peak_bytes", "retained_bytes"):
+            limit = base[metric] * (1 + alloc_tolerance) + ALLOC_SLACK_BYTES
+            if cur[metric] > limit:
+                failures.append(f"{key}: {metric} {cur[metric]} > baseline {base[metric]} (+{alloc_tolerance:.0%})")
+        if cur["p50_us"] > base["p50_us"] * (1 + latency_tolerance):
+            warnings.append(f"{key}: p50 {cur['p50_us']:.1f} us > baseline {base['p50_us']:.1f} us "
+                            f"(+{latency_tolerance:.0%})")
+    return failures, warnings
+
+
+def print_report(results: dict, baseline: dict = None):
+    base_cases = (baseline or {}).get("cases", {})
+    print("\n========== WRAPPER MICRO-BENCHMARKS ==========")
+    print(f"{'case':<28} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'max us':>9} "
+          f"{'peak KiB':>9} {'kept KiB':>9} {'vs base':>8}")
+    for key, r in results["cases"].items():
+        base = base_cases.get(key)
+        delta = f"{(r['peak_bytes'] - base['peak_bytes']) / 1024:+8.1f}" if base else f"{'new':>8}"
+        print(f"{key:<28} {r['p50_us']:9.1f} {r['p95_us']:9.1f} {r['p99_us']:9.1f} {r['max_us']:9.1f} "
+              f"{r['peak_bytes'] / 1024:9.1f} {r['retained_bytes'] / 1024:9.1f} {delta}")
+    suite = results["suite"]
+    print("----------------------------------------------")
+    print(f"Peak traced memory : {suite['traced_peak_bytes'] / 2**20:.2f} MiB (largest single call)")
+    print(f"Process RSS        : {suite['rss_bytes'] / 2**20:.1f} MiB")
+    print("==============================================")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="wrapper.py latency / allocation micro-benchmarks")
+    parser.add_argument("--baseline", help="Compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="Write the results as a new baseline JSON")
+    parser.add_argument("--alloc-tolerance", type=float, default=ALLOC_TOLERANCE)
+    parser.add_argument("--latency-tolerance", type=float, default=LATENCY_TOLERANCE)
+    parser.add_argument("--fail-on-latency", action="store_true")
+    args = parser.parse_args()
+
+    results = run(build_cases())
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"[INFO] Baseline written to {args.save_baseline}")
+
+    if baseline is None:
+        return
+    failures, warnings = compare(results, baseline, args.alloc_tolerance, args.latency_tolerance)
+    for w in warnings:
+        print(f"[WARN] Latency regression: {w}")
+    if args.fail_on_latency:
+        failures += [f"latency: {w}" for w in warnings]
+    if failures:
+        print("\n" + "!" * 60)
+        print(f"[FAIL] {len(failures)} regression(s) against {args.baseline}:")
+        for msg in failures:
+            print(f"   {msg}")
+        print("!" * 60)
+        sys.exit(1)
+    print("[OK] No allocation regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ class FaceDetector:
             self.face_cascade = cv2.CascadeClassifier(
                 cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         elif self.method == 'dlib':
+            # Optional backend: imported once here, never in the per-frame path
             import dlib
             self.detector = dlib.get_frontal_face_detector()
         else:
@@ -19,7 +20,6 @@ class FaceDetector:
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
             faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
         elif self.method == 'dlib':
-            import dlib
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
             rects = self.detector(gray, 1)
             faces = [(r.left(), r.top(), r.width(), r.height()) for r in rects]
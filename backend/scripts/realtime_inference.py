@@ -1,26 +1,42 @@
 import cv2
 import time
-from collections import deque
 import sys, os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from wrapper import EmotionDetector, AgeDetector
+from wrapper import ModelManager, EmotionFERPlus, AgeCaffeNet, GenderCaffeNet
+from smoothing import FaceSmoother
 
 # Parameters
-EMOTION_THRESHOLD = 0.7      # Only consider 'happy' if score > threshold
-SMOOTHING_WINDOW = 5         # Number of frames to smooth predictions
+EMOTION_THRESHOLD = 0.7      # Smoothed 'happiness' probability that turns the smile trigger on
+SMOOTHING_ALPHA = 0.4        # EMA weight of the newest prediction
 
 # Initialize models
-emotion_detector = EmotionDetector()
-age_detector = AgeDetector()
+mgr = ModelManager()
+try:
+    mgr.register_emotion_model("ferplus", EmotionFERPlus("models/emotion-ferplus.onnx"))
+except Exception as e:
+    print(f"[WARN] EmotionFERPlus not registered: {e}")
+try:
+    mgr.register_age_model("caffe_age", AgeCaffeNet())
+except Exception as e:
+    print(f"[WARN] AgeCaffeNet not registered: {e}")
+try:
+    mgr.register_gender_model("caffe_gender", GenderCaffeNet())
+except Exception as e:
+    print(f"[WARN] GenderCaffeNet not registered: {e}")
 
 # Initialize face detector (Haar cascade)
 face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
 
-# Buffers for smoothing
-emotion_buffer = deque(maxlen=SMOOTHING_WINDOW)
-age_buffer = deque(maxlen=SMOOTHING_WINDOW)
+# Per-face smoothing state
+smoother = FaceSmoother(
+    emotion_labels=EmotionFERPlus.DEFAULT_EMOTIONS,
+    age_labels=AgeCaffeNet.AGE_BUCKETS,
+    gender_labels=GenderCaffeNet.GENDER_LIST,
+    alpha=SMOOTHING_ALPHA,
+    smile_threshold=EMOTION_THRESHOLD,
+)
 
 # Open webcam
 cap = cv2.VideoCapture(0)
@@ -37,34 +53,29 @@ while True:
 
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     faces = face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5)
-
-    for (x, y, w, h) in faces:
-        # Age Detection
-        try:
-            age, age_conf = age_detector.detect_age(frame, (x, y, w, h))
-        except Exception as e:
-            age, age_conf = "Error", 0.0
-
-        age_buffer.append(age)
-        smoothed_age = max(set(age_buffer), key=age_buffer.count)
-
-        # Emotion Detection
-        emotion, score = emotion_detector.detect_emotion(frame)
-        if emotion is not None:
-            # Apply threshold
-            if emotion == "happy" and score < EMOTION_THRESHOLD:
-                emotion = "neutral"
-            emotion_buffer.append(emotion)
+    track_ids = smoother.update_tracks(faces)
+
+    for tid, (x, y, w, h) in zip(track_ids, faces):
+        face_img = frame[y:y+h, x:x+w]
+
+        # Inference only while the smoothed state is still changing
+        if smoother.should_infer(tid):
+            smoother.update(
+                tid,
+                emotion=mgr.predict_emotion_proba(face_img),
+                age=mgr.predict_age_proba(face_img),
+                gender=mgr.predict_gender_proba(face_img),
+            )
         else:
-            emotion_buffer.append("unknown")
-
-        smoothed_emotion = max(set(emotion_buffer), key=emotion_buffer.count)
+            smoother.skip(tid)
+        result = smoother.result(tid)
 
         # Display results
-        cv2.rectangle(frame, (x, y), (x+w, y+h), (255,0,0), 2)
-        cv2.putText(frame, f"{smoothed_age}", (x, y-35),
+        color = (0, 255, 0) if result["is_smiling"] else (255, 0, 0)
+        cv2.rectangle(frame, (x, y), (x+w, y+h), color, 2)
+        cv2.putText(frame, f"#{tid} {result['age']} {result['gender']}", (x, y-35),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0), 2)
-        cv2.putText(frame, f"{smoothed_emotion}", (x, y-10),
+        cv2.putText(frame, f"{result['emotion']} ({result['emotion_conf']:.2f})", (x, y-10),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255), 2)
 
     # FPS Calculation
@@ -80,4 +91,4 @@ while True:
         break
 
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+cv2.destroyAllWindows()
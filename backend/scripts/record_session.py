@@ -0,0 +1,66 @@
+# record_session.py
+"""
+Records a camera session to disk for deterministic replay.
+
+The recording can be played back by the server instead of a camera:
+    SMILAGE_REPLAY=sessions/kiosk1 uvicorn app:app
+
+Frames are stored as the camera's own JPEGs when it delivers MJPEG
+(no re-encode), otherwise they are JPEG-encoded at --quality.
+
+Usage (from backend/):
+    python scripts/record_session.py sessions/kiosk1 --seconds 30
+    python scripts/record_session.py sessions/hd --width 1280 --height 720 --fps 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from capture import CameraSource, SessionRecorder
+
+
+def record(directory, seconds=30.0, index=0, width=640, height=480, fps=30, quality=90):
+    camera = CameraSource(index, width, height, fps, passthrough=True)
+    if not camera.open():
+        print(f"(!) Could not open camera {index}.")
+        return 0
+    print(f"[INFO] Camera negotiated: {camera.negotiated}")
+
+    recorder = SessionRecorder(directory, meta=camera.negotiated, jpeg_quality=quality)
+    start = time.monotonic()
+    try:
+        while time.monotonic() - start < seconds:
+            ret, frame = camera.read()
+            if not ret:
+                continue
+            recorder.write(frame, time.monotonic())
+    except KeyboardInterrupt:
+        print("[INFO] Recording stopped.")
+    finally:
+        camera.release()
+        recorder.close()
+
+    elapsed = time.monotonic() - start
+    print(f"[INFO] Recorded {recorder.frames} frames in {elapsed:.1f} s "
+          f"({recorder.frames / elapsed:.1f} FPS) to {directory}")
+    return recorder.frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a camera session for replay")
+    parser.add_argument("directory")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--quality", type=int, default=90, help="JPEG quality if the camera is not MJPEG")
+    args = parser.parse_args()
+    record(args.directory, args.seconds, args.camera, args.width, args.height, args.fps, args.quality)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import time
 import os
 import numpy as np
 from wrapper import ModelManager, EmotionFERPlus, AgeCaffeNet, GenderCaffeNet
+from quality import face_sharpness
 
 # -------------------------
 # Initialize model manager
@@ -24,14 +25,6 @@ smile_threshold = 0.7
 blur_threshold = 80.0  # Higher means more blurry
 MESSAGE_DURATION = 2.0
 
-# -------------------------
-# Helper: Blur detection
-# -------------------------
-def variance_of_laplacian(image):
-    """Return the Laplacian variance (focus measure). Low value => blurry."""
-    return cv2.Laplacian(image, cv2.CV_64F).var()
-
-
 # -------------------------
 # Main camera loop (only runs if executed directly)
 # -------------------------
@@ -87,8 +80,8 @@ def run_camera():
             else:
                 smile_captured = False
 
-            # Blur detection
-            blur_score = variance_of_laplacian(face_img)
+            # Blur detection (reuses the detection gray frame)
+            blur_score = face_sharpness(gray, (x, y, w, h))
             if blur_score < blur_threshold:
                 cv2.putText(frame, "Blurry", (x, y + h + 100),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
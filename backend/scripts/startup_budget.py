@@ -0,0 +1,111 @@
+# startup_budget.py
+"""
+Measures server start-up cost against a budget.
+
+Imports the server module (default: app) in a fresh interpreter, from the
+backend directory, and reports:
+  - wall-clock import time (includes model loading)
+  - resident memory (RSS) right after import
+  - the slowest imports (from `python -X importtime`)
+  - any heavy optional packages that got imported (they should stay lazy)
+
+Exits with status 1 if a budget is exceeded, so it can run in CI.
+
+Usage (from backend/):
+    python scripts/startup_budget.py
+    python scripts/startup_budget.py --import-budget 2.0 --rss-budget 300
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_S = 3.0
+RSS_BUDGET_MB = 350.0
+HEAVY_MODULES = ["tensorflow", "keras", "torch", "dlib", "face_recognition",
+                 "fer", "moviepy", "sklearn", "matplotlib", "av"]
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+import psutil
+rss = psutil.Process().memory_info().rss
+heavy = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps({{"import_s": elapsed, "rss_mb": rss / 2**20, "heavy_modules": heavy}}))
+"""
+
+
+def parse_importtime(stderr: str, top: int = 10, depth: int = 1):
+    """Imports at the given nesting depth (1 = direct imports of the module), by cumulative time (ms)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+        except ValueError:
+            continue
+        # -X importtime indents nested imports by two spaces per level
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level != depth:
+            continue
+        rows.append((int(cumulative) / 1000.0, name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def measure(module: str = "app"):
+    code = CHILD.format(module=module, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing '{module}' failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["slowest_imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server import-time / RSS budget check")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_S, help="seconds")
+    parser.add_argument("--rss-budget", type=float, default=RSS_BUDGET_MB, help="MiB")
+    args = parser.parse_args()
+
+    try:
+        result = measure(args.module)
+    except RuntimeError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
+
+    print("\n========== STARTUP BUDGET ==========")
+    print(f"Import time : {result['import_s']:.2f} s (budget {args.import_budget:.2f} s)")
+    print(f"RSS         : {result['rss_mb']:.1f} MiB (budget {args.rss_budget:.1f} MiB)")
+    print("Slowest imports:")
+    for ms, name in result["slowest_imports"]:
+        print(f"   {ms:8.1f} ms  {name}")
+    if result["heavy_modules"]:
+        print(f"Heavy optional modules imported: {', '.join(result['heavy_modules'])}")
+    print("====================================")
+
+    failures = []
+    if result["import_s"] > args.import_budget:
+        failures.append("import time")
+    if result["rss_mb"] > args.rss_budget:
+        failures.append("RSS")
+    if result["heavy_modules"]:
+        failures.append("heavy imports")
+    if failures:
+        print(f"[FAIL] Over budget: {', '.join(failures)}")
+        sys.exit(1)
+    print("[OK] Within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# backend/smile_gate.py
+"""
+Two-stage smile trigger: a cheap Haar smile cascade in front of FER+.
+
+SmileCascade looks for a smile in the lower half of the face ROI, resized to
+a fixed width so its cost does not depend on how close the guest stands.
+SmileGate decides per face track whether the full FER+ pass is needed:
+  - the cascade fires (a possible smile, FER+ confirms it),
+  - the cascade just stopped firing (so the smoothed smile state can drop),
+  - the track is new, or
+  - nothing ran for `refresh_interval` frames (slow refresh that keeps the
+    emotion label current and catches smiles the cascade misses).
+
+The cascade's miss rate against FER+ is measured by
+`scripts/benchmark_models.py --smile-prefilter`.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+# -------------------------
+# Defaults
+# -------------------------
+SMILE_CASCADE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "haarcascade_smile.xml")
+SMILE_ROI_WIDTH = 96           # Lower face half is resized to this width
+SMILE_SCALE_FACTOR = 1.3
+SMILE_MIN_NEIGHBORS = 15       # The smile cascade is noisy: require many overlapping hits
+REFRESH_INTERVAL = 15          # Run FER+ at least every N gated frames per track
+
+
+class SmileCascade:
+    def __init__(self, path: str = SMILE_CASCADE_PATH, roi_width: int = SMILE_ROI_WIDTH,
+                 scale_factor: float = SMILE_SCALE_FACTOR, min_neighbors: int = SMILE_MIN_NEIGHBORS):
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise RuntimeError(f"Could not load smile cascade: {path}")
+        self.roi_width = roi_width
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    def detect(self, gray: np.ndarray, box) -> bool:
+        """True if a smile is found in the lower half of face `box` (x, y, w, h) of a gray frame."""
+        x, y, w, h = (int(v) for v in box)
+        mouth = gray[y + h // 2:y + h, x:x + w]
+        if mouth.size == 0:
+            return False
+        scale = self.roi_width / float(mouth.shape[1])
+        mouth = cv2.resize(mouth, (self.roi_width, max(1, int(mouth.shape[0] * scale))),
+                           interpolation=cv2.INTER_AREA)
+        # A smile spans roughly a third of the face width or more
+        min_w = self.roi_width // 3
+        smiles = self.cascade.detectMultiScale(mouth, self.scale_factor, self.min_neighbors,
+                                               minSize=(min_w, min_w // 2))
+        return len(smiles) > 0
+
+
+class SmileGate:
+    """Per-track decision whether the expensive emotion model should run."""
+
+    def __init__(self, cascade: SmileCascade = None, refresh_interval: int = REFRESH_INTERVAL):
+        self.cascade = cascade or SmileCascade()
+        self.refresh_interval = refresh_interval
+        self._tracks = {}      # track_id -> [last cascade hit, frames since FER+]
+        self.cascade_hits = 0
+        self.fer_runs = 0
+        self.gated = 0
+
+    def should_run(self, track_id, gray: np.ndarray, box) -> bool:
+        hit = self.cascade.detect(gray, box)
+        state = self._tracks.get(track_id)
+        if state is None:
+            state = self._tracks[track_id] = [hit, self.refresh_interval]
+        was_hit, since = state
+        self.cascade_hits += hit
+
+        run = hit or was_hit or since >= self.refresh_interval
+        state[0], state[1] = hit, 0 if run else since + 1
+        if run:
+            self.fer_runs += 1
+        else:
+            self.gated += 1
+        return run
+
+    def prune(self, track_ids):
+        """Forget tracks that are no longer present."""
+        live = set(track_ids)
+        for tid in [t for t in self._tracks if t not in live]:
+            del self._tracks[tid]
+
+    def stats(self) -> dict:
+        total = self.fer_runs + self.gated
+        return {
+            "cascade_hits": self.cascade_hits,
+            "fer_runs": self.fer_runs,
+            "gated": self.gated,
+            "fer_rate": self.fer_runs / total if total else 0.0,
+        }
@@ -0,0 +1,197 @@
+# backend/smoothing.py
+"""
+Temporal smoothing of per-face predictions.
+
+Faces are matched across frames by box overlap (IoU) and each track keeps an
+exponential moving average of the full emotion / age / gender probability
+vectors. Updates are O(classes) per frame, independent of history length.
+The smile trigger uses hysteresis on the smoothed happiness probability so a
+score hovering around the threshold does not flicker on and off.
+"""
+
+import numpy as np
+
+# -------------------------
+# Defaults
+# -------------------------
+EMA_ALPHA = 0.4            # Weight of the newest prediction
+SMILE_HYSTERESIS = 0.15    # Trigger turns off below (threshold - hysteresis)
+STABLE_DELTA = 0.05        # Max L1 change of the emotion EMA to count as stable
+STABLE_FRAMES = 5          # Consecutive stable updates before inference is skipped
+MAX_SKIP_FRAMES = 10       # Always refresh inference after this many skipped frames
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two sets of (x, y, w, h) boxes."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    ax2, ay2 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx2, by2 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    iw = np.minimum(ax2[:, None], bx2[None, :]) - np.maximum(a[:, 0][:, None], b[:, 0][None, :])
+    ih = np.minimum(ay2[:, None], by2[None, :]) - np.maximum(a[:, 1][:, None], b[:, 1][None, :])
+    inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+# -------------------------
+# Face tracking
+# -------------------------
+class FaceTracker:
+    """Greedy IoU matcher that assigns a stable integer id to each face box."""
+
+    def __init__(self, iou_threshold: float = 0.3, max_missed: int = 10):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.boxes = {}      # track_id -> last box
+        self.missed = {}     # track_id -> frames since last seen
+        self._next_id = 0
+
+    def update(self, boxes):
+        """
+        Match `boxes` to existing tracks.
+        Returns (track_ids aligned with `boxes`, list of track ids that expired).
+        """
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        track_ids = list(self.boxes)
+        assigned = [-1] * len(boxes)
+
+        if track_ids and len(boxes):
+            ious = iou_matrix(boxes, [self.boxes[t] for t in track_ids])
+            # Greedy: best pairs first
+            for flat in np.argsort(ious, axis=None)[::-1]:
+                i, j = divmod(int(flat), len(track_ids))
+                if ious[i, j] < self.iou_threshold:
+                    break
+                if assigned[i] == -1 and track_ids[j] not in assigned:
+                    assigned[i] = track_ids[j]
+
+        for i, box in enumerate(boxes):
+            if assigned[i] == -1:
+                assigned[i] = self._next_id
+                self._next_id += 1
+            self.boxes[assigned[i]] = box
+            self.missed[assigned[i]] = 0
+
+        expired = []
+        for t in track_ids:
+            if t not in assigned:
+                self.missed[t] += 1
+                if self.missed[t] > self.max_missed:
+                    expired.append(t)
+        for t in expired:
+            del self.boxes[t], self.missed[t]
+        return assigned, expired
+
+
+# -------------------------
+# Per-track state
+# -------------------------
+class _TrackState:
+    __slots__ = ("emotion", "age", "gender", "smiling", "stable_count", "skipped")
+
+    def __init__(self):
+        self.emotion = None
+        self.age = None
+        self.gender = None
+        self.smiling = False
+        self.stable_count = 0
+        self.skipped = 0
+
+
+def _ema(state, probs, alpha):
+    """In-place EMA update. Returns (new state, L1 change)."""
+    probs = np.asarray(probs, dtype=np.float32).ravel()
+    if state is None or state.shape != probs.shape:
+        return probs.copy(), float("inf")
+    delta = float(np.abs(probs - state).sum()) * alpha
+    state *= (1.0 - alpha)
+    state += alpha * probs
+    return state, delta
+
+
+class FaceSmoother:
+    """
+    Tracks faces and smooths their predictions.
+
+    Typical per-frame use:
+        track_ids = smoother.update_tracks(faces)
+        if smoother.should_infer(tid):
+            smoother.update(tid, emotion=..., age=..., gender=...)
+        else:
+            smoother.skip(tid)
+        result = smoother.result(tid)
+    """
+
+    def __init__(self, emotion_labels, age_labels=None, gender_labels=None,
+                 alpha: float = EMA_ALPHA, smile_label: str = "happiness",
+                 smile_threshold: float = 0.7, hysteresis: float = SMILE_HYSTERESIS,
+                 stable_delta: float = STABLE_DELTA, stable_frames: int = STABLE_FRAMES,
+                 max_skip: int = MAX_SKIP_FRAMES):
+        self.emotion_labels = list(emotion_labels)
+        self.age_labels = list(age_labels or [])
+        self.gender_labels = list(gender_labels or [])
+        self.smile_index = self.emotion_labels.index(smile_label) if smile_label in self.emotion_labels else None
+        self.alpha = alpha
+        self.smile_threshold = smile_threshold
+        self.hysteresis = hysteresis
+        self.stable_delta = stable_delta
+        self.stable_frames = stable_frames
+        self.max_skip = max_skip
+        self.tracker = FaceTracker()
+        self.tracks = {}
+
+    def update_tracks(self, boxes):
+        track_ids, expired = self.tracker.update(boxes)
+        for t in expired:
+            self.tracks.pop(t, None)
+        for t in track_ids:
+            if t not in self.tracks:
+                self.tracks[t] = _TrackState()
+        return track_ids
+
+    def should_infer(self, track_id) -> bool:
+        st = self.tracks[track_id]
+        return st.stable_count < self.stable_frames or st.skipped >= self.max_skip
+
+    def skip(self, track_id):
+        self.tracks[track_id].skipped += 1
+
+    def needs_age_gender(self, track_id) -> bool:
+        """True until the track has both an age and a gender estimate."""
+        st = self.tracks[track_id]
+        return st.age is None or st.gender is None
+
+    def update(self, track_id, emotion=None, age=None, gender=None):
+        st = self.tracks[track_id]
+        st.skipped = 0
+        if emotion is not None:
+            st.emotion, delta = _ema(st.emotion, emotion, self.alpha)
+            st.stable_count = st.stable_count + 1 if delta < self.stable_delta else 0
+            if self.smile_index is not None:
+                score = float(st.emotion[self.smile_index])
+                if st.smiling:
+                    st.smiling = score >= self.smile_threshold - self.hysteresis
+                else:
+                    st.smiling = score >= self.smile_threshold
+        if age is not None:
+            st.age, _ = _ema(st.age, age, self.alpha)
+        if gender is not None:
+            st.gender, _ = _ema(st.gender, gender, self.alpha)
+
+    def result(self, track_id) -> dict:
+        """Smoothed labels/confidences for one track ('-' where unknown)."""
+        st = self.tracks[track_id]
+        out = {"emotion": "-", "emotion_conf": 0.0, "age": "-", "gender": "-",
+               "smile_score": 0.0, "is_smiling": st.smiling}
+        if st.emotion is not None:
+            idx = int(np.argmax(st.emotion))
+            out["emotion"] = self.emotion_labels[idx]
+            out["emotion_conf"] = float(st.emotion[idx])
+            if self.smile_index is not None:
+                out["smile_score"] = float(st.emotion[self.smile_index])
+        if st.age is not None and self.age_labels:
+            out["age"] = self.age_labels[int(np.argmax(st.age))]
+        if st.gender is not None and self.gender_labels:
+            out["gender"] = self.gender_labels[int(np.argmax(st.gender))]
+        return out
@@ -0,0 +1,186 @@
+# backend/streaming.py
+"""
+Optional inter-frame video streaming (H.264 / VP8) as an alternative to
+sending an independent JPEG per frame.
+
+One VideoBroadcaster per camera source encodes each frame once with PyAV
+and fans the packets out to every subscribed viewer. The client that opened
+the stream drives the camera; the stream keeps running while any viewer is
+subscribed, even after that client has left. A viewer that joins
+mid-stream forces the next frame to be a keyframe and receives nothing until
+that keyframe arrives, so its decoder always starts from a clean state.
+
+Packets are sent as binary WebSocket messages: 1 flag byte (1 = keyframe)
+followed by the raw bitstream (Annex-B for H.264, which repeats SPS/PPS on
+every keyframe), ready for a WebCodecs VideoDecoder on the client.
+"""
+
+import asyncio
+from fractions import Fraction
+
+# Optional PyAV import: loaded on first VideoEncoder construction, so the
+# server does not pay for it unless a codec stream is actually requested.
+av = None
+
+
+def _load_av():
+    global av
+    if av is None:
+        try:
+            import av as _av
+        except Exception:
+            return None
+        av = _av
+    return av
+
+# -------------------------
+# Defaults
+# -------------------------
+CODECS = {
+    # name -> (FFmpeg encoder, encoder options)
+    "h264": ("libx264", {"preset": "ultrafast", "tune": "zerolatency"}),
+    "vp8": ("libvpx", {"deadline": "realtime", "cpu-used": "8", "lag-in-frames": "0"}),
+}
+STREAM_BITRATE = 800_000       # bits/s, sized for weak uplinks
+KEYFRAME_INTERVAL_S = 2        # Regular keyframe spacing (seconds)
+VIEWER_QUEUE_SIZE = 30         # Packets buffered per viewer before dropping
+
+
+def _keyframe_pict_type():
+    try:
+        from av.video.frame import PictureType
+        return PictureType.I
+    except Exception:
+        return "I"
+
+
+class VideoEncoder:
+    """Thin wrapper around a PyAV encoder context, created on the first frame."""
+
+    def __init__(self, codec: str = "h264", fps: int = 30, bitrate: int = STREAM_BITRATE):
+        if _load_av() is None:
+            raise RuntimeError("PyAV is required for video streaming (pip install av).")
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported codec '{codec}'. Choose one of {list(CODECS)}.")
+        self.codec = codec
+        self.fps = fps
+        self.bitrate = bitrate
+        self.ctx = None
+        self.pts = 0
+        self._key_type = _keyframe_pict_type()
+
+    def _open(self, width, height):
+        name, options = CODECS[self.codec]
+        ctx = av.CodecContext.create(name, "w")
+        ctx.width, ctx.height = width, height
+        ctx.pix_fmt = "yuv420p"
+        ctx.time_base = Fraction(1, self.fps)
+        ctx.framerate = Fraction(self.fps, 1)
+        ctx.bit_rate = self.bitrate
+        ctx.gop_size = self.fps * KEYFRAME_INTERVAL_S
+        ctx.max_b_frames = 0
+        ctx.options = dict(options)
+        self.ctx = ctx
+
+    def encode(self, bgr, keyframe: bool = False):
+        """Encodes one BGR frame. Returns a list of (is_keyframe, bytes)."""
+        # yuv420p needs even dimensions
+        h, w = bgr.shape[0] & ~1, bgr.shape[1] & ~1
+        if self.ctx is None:
+            self._open(w, h)
+        frame = av.VideoFrame.from_ndarray(bgr[:h, :w], format="bgr24")
+        frame.pts = self.pts
+        self.pts += 1
+        if keyframe:
+            frame.pict_type = self._key_type
+        return [(bool(p.is_keyframe), bytes(p)) for p in self.ctx.encode(frame)]
+
+
+class _Viewer:
+    __slots__ = ("queue", "synced", "dropped")
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=VIEWER_QUEUE_SIZE)
+        self.synced = False   # True once the first keyframe was queued
+        self.dropped = 0
+
+
+class VideoBroadcaster:
+    """Encodes once per frame and fans packets out to all viewers of one source."""
+
+    def __init__(self, codec: str = "h264", fps: int = 30, bitrate: int = STREAM_BITRATE):
+        self.encoder = VideoEncoder(codec, fps, bitrate)
+        self.viewers = []
+        self._keyframe_requested = True
+        self.frames_encoded = 0
+        self.bytes_out = 0
+
+    def subscribe(self) -> _Viewer:
+        viewer = _Viewer()
+        self.viewers.append(viewer)
+        self._keyframe_requested = True   # keyframe-on-join
+        return viewer
+
+    def unsubscribe(self, viewer: _Viewer):
+        """Removes a viewer and ends its forward_to_websocket() loop."""
+        if viewer in self.viewers:
+            self.viewers.remove(viewer)
+            self._put(viewer, None)
+
+    def publish(self, bgr, metadata: dict = None):
+        """Encode `bgr` once and queue the packets (plus JSON metadata) for every viewer."""
+        if not self.viewers:
+            return
+        packets = self.encoder.encode(bgr, keyframe=self._keyframe_requested)
+        self._keyframe_requested = False
+        self.frames_encoded += 1
+        for is_key, data in packets:
+            message = (b"\x01" if is_key else b"\x00") + data
+            for viewer in self.viewers:
+                if not viewer.synced and not is_key:
+                    continue
+                viewer.synced = True
+                self.bytes_out += len(message)
+                self._put(viewer, message)
+        if metadata is not None:
+            for viewer in self.viewers:
+                self._put(viewer, metadata)
+
+    def _put(self, viewer: _Viewer, item):
+        try:
+            viewer.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # A slow viewer loses its backlog and resyncs on the next keyframe
+            while not viewer.queue.empty():
+                viewer.queue.get_nowait()
+            viewer.dropped += 1
+            if item is None or (isinstance(item, bytes) and item[0] == 1):
+                viewer.queue.put_nowait(item)
+            else:
+                viewer.synced = False
+                self._keyframe_requested = True
+
+    def close(self):
+        for viewer in self.viewers:
+            self._put(viewer, None)   # end-of-stream marker
+
+    def stats(self) -> dict:
+        return {
+            "codec": self.encoder.codec,
+            "viewers": len(self.viewers),
+            "frames_encoded": self.frames_encoded,
+            "bytes_out": self.bytes_out,
+            "dropped": sum(v.dropped for v in self.viewers),
+        }
+
+
+async def forward_to_websocket(websocket, viewer: _Viewer):
+    """Sends queued packets (binary) and metadata (JSON) until the stream ends."""
+    while True:
+        item = await viewer.queue.get()
+        if item is None:
+            return
+        if isinstance(item, bytes):
+            await websocket.send_bytes(item)
+        else:
+            await websocket.send_json(item)
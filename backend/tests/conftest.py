@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+# The backend is a flat set of modules: make them importable as in app.py.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+# backend/tests/test_capture.py
+import numpy as np
+import pytest
+
+from capture import CapturedFrame, ReplaySource, SessionRecorder
+
+
+@pytest.fixture
+def session(tmp_path):
+    recorder = SessionRecorder(tmp_path, meta={"fps": 30})  # no width/height recorded
+    for i in range(5):
+        image = np.full((48, 64, 3), i * 40, dtype=np.uint8)
+        recorder.write(CapturedFrame(image=image), t=i / 30)
+    recorder.close()
+    return tmp_path
+
+
+def brightness(frame):
+    return int(round(frame.image.mean() / 40))
+
+
+def test_unpaced_replay_returns_every_frame_in_order(session):
+    replay = ReplaySource(session, loop=True)
+    assert replay.open()
+    frames = [replay.read() for _ in range(7)]
+    assert all(ok for ok, _ in frames)
+    assert [brightness(f) for _, f in frames] == [0, 1, 2, 3, 4, 0, 1]
+    replay.release()
+
+
+def test_negotiated_size_comes_from_first_frame(session):
+    replay = ReplaySource(session, passthrough=True)
+    assert replay.open()
+    assert (replay.negotiated["width"], replay.negotiated["height"]) == (64, 48)
+    assert replay.negotiated["frames"] == 5 and replay.passthrough
+    replay.release()
+
+
+def test_replay_without_loop_ends(session):
+    replay = ReplaySource(session, loop=False)
+    replay.open()
+    assert [replay.read()[0] for _ in range(6)] == [True] * 5 + [False]
+    replay.release()
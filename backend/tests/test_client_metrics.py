@@ -0,0 +1,32 @@
+# backend/tests/test_client_metrics.py
+import json
+
+import pytest
+
+from client_metrics import parse_client_metrics
+
+
+def test_keeps_numeric_fields_only():
+    report = parse_client_metrics({"action": "client_metrics", "frames": "12", "dropped": 1,
+                                   "decode_ms": {"avg": 1.5, "p95": 3, "extra": "x"}, "paint_ms": None})
+    assert report["frames"] == 12 and report["dropped"] == 1
+    assert report["decode_ms"] == {"avg": 1.5, "p95": 3.0, "max": 0.0}
+    assert report["paint_ms"] == {"avg": 0.0, "p95": 0.0, "max": 0.0}
+    json.dumps(report, allow_nan=False)
+
+
+@pytest.mark.parametrize("data", [
+    json.loads('{"frames": 1e999}'),
+    json.loads('{"decode_ms": {"p95": 1e999}}'),
+    json.loads('{"paint_ms": {"avg": -1e999}}'),
+    {"dropped": float("nan")},
+])
+def test_rejects_non_finite_values(data):
+    with pytest.raises(ValueError):
+        parse_client_metrics(data)
+
+
+@pytest.mark.parametrize("data", [{"frames": "many"}, {"decode_ms": {"avg": [1]}}, {"decode_ms": 5}])
+def test_rejects_malformed_reports(data):
+    with pytest.raises((TypeError, ValueError, AttributeError)):
+        parse_client_metrics(data)
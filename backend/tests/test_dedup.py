@@ -0,0 +1,73 @@
+# backend/tests/test_dedup.py
+import json
+
+import dedup
+from dedup import CaptureDeduper, CaptureIndex, is_near_duplicate
+
+
+def entry(filename, frame=0, face=0, time=0.0):
+    return {"filename": filename, "frame": frame, "face": face, "sharpness": 100.0, "track": 1, "time": time}
+
+
+def test_near_duplicate_tolerance_is_halved_across_tracks():
+    a, b = {"frame": 0, "face": 0}, {"frame": 0b111111, "face": 0}  # 6 frame bits differ
+    assert is_near_duplicate(a, b, same_track=True)
+    assert not is_near_duplicate(a, b, same_track=False)
+
+
+def test_deduper_keep_drop_replace():
+    deduper = CaptureDeduper(window_s=10)
+    sig = {"frame": 0, "face": 0}
+    assert deduper.check(sig, 1, 100.0, now=0.0) == ("keep", None)
+    first = deduper.remember("a.jpg", sig, 1, 100.0, now=0.0)
+    assert deduper.check(sig, 1, 105.0, now=1.0) == ("drop", first)
+    assert deduper.check(sig, 1, 120.0, now=1.0) == ("replace", first)
+    assert deduper.check(sig, 1, 100.0, now=20.0)[0] == "keep"  # outside the window
+
+
+def test_sharper_auto_capture_never_replaces_a_manual_one():
+    deduper = CaptureDeduper(window_s=10)
+    sig = {"frame": 0, "face": 0}
+    manual = deduper.remember("selfie_manual.jpg", sig, 0, 100.0, now=0.0, manual=True)
+    assert deduper.check(sig, 0, 150.0, now=1.0) == ("drop", manual)
+
+
+def test_capture_index_remove_is_append_only(tmp_path):
+    index = CaptureIndex(tmp_path)
+    index.add(entry("a.jpg", frame=0xABC))
+    index.add(entry("b.jpg"))
+    assert index.remove("a.jpg") == 1
+    lines = (tmp_path / "captures.jsonl").read_text().splitlines()
+    assert len(lines) == 3 and json.loads(lines[-1]) == {"deleted": "a.jpg"}
+    assert [e["filename"] for e in CaptureIndex(tmp_path).entries] == ["b.jpg"]
+
+
+def test_capture_index_workers_keep_each_others_entries(tmp_path):
+    worker_a, worker_b = CaptureIndex(tmp_path), CaptureIndex(tmp_path)
+    worker_a.add(entry("a.jpg"))
+    worker_b.add(entry("b.jpg", frame=0xFF))
+    worker_a.remove("b.jpg")  # not in worker_a's memory, still tombstoned
+    worker_a.add(entry("c.jpg"))
+    worker_a.compact()
+    entries = CaptureIndex(tmp_path).entries
+    assert [e["filename"] for e in entries] == ["a.jpg", "c.jpg"]
+    assert len((tmp_path / "captures.jsonl").read_text().splitlines()) == 2
+
+
+def test_capture_index_compacts_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup, "COMPACT_MIN_TOMBSTONES", 1)
+    worker_a, worker_b = CaptureIndex(tmp_path), CaptureIndex(tmp_path)
+    worker_a.add(entry("a.jpg"))
+    worker_b.add(entry("b.jpg"))
+    worker_b.add(entry("c.jpg"))
+    worker_a.remove("a.jpg")  # compacts: more tombstones than entries in worker_a's memory
+    assert [e["filename"] for e in CaptureIndex(tmp_path).entries] == ["b.jpg", "c.jpg"]
+    assert worker_a._tombstones == 0
+
+
+def test_deduper_reset_forgets_recent_captures():
+    deduper = CaptureDeduper()
+    sig = {"frame": 0, "face": 0}
+    deduper.remember("a.jpg", sig, 1, 100.0, now=0.0)
+    deduper.reset()
+    assert deduper.check(sig, 1, 100.0, now=1.0) == ("keep", None)
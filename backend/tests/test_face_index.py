@@ -0,0 +1,160 @@
+# backend/tests/test_face_index.py
+import numpy as np
+import pytest
+
+import face_index as face_index_module
+from face_index import FaceIndex
+
+
+def vec(seed):
+    v = np.random.default_rng(seed).normal(size=128).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def add(index, filename, seed):
+    index.add(filename, vec(seed)[None, :], [(0, 0, 10, 10)])
+
+
+def filenames(index, seed):
+    return [m["filename"] for m in index.search(vec(seed), tolerance=0.1)]
+
+
+def test_add_search_remove(tmp_path):
+    index = FaceIndex(tmp_path)
+    add(index, "a.jpg", 1)
+    add(index, "b.jpg", 2)
+    assert filenames(index, 1) == ["a.jpg"]
+    assert index.remove("a.jpg") == 1
+    assert filenames(index, 1) == [] and len(index) == 1
+    assert len(index.vectors_for("a.jpg")) == 0
+    assert len(index.vectors_for("b.jpg")) == 1
+
+
+def test_remove_is_append_only(tmp_path):
+    index = FaceIndex(tmp_path)
+    for i in range(5):
+        add(index, f"{i}.jpg", i)
+    size = (tmp_path / "embeddings.f32").stat().st_size
+    index.remove("3.jpg")
+    assert (tmp_path / "embeddings.f32").stat().st_size == size
+    assert FaceIndex(tmp_path).vectors_for("3.jpg").shape == (0, 128)
+    assert len(FaceIndex(tmp_path)) == 4
+
+
+def test_workers_do_not_lose_each_others_entries(tmp_path):
+    worker_a, worker_b = FaceIndex(tmp_path), FaceIndex(tmp_path)
+    add(worker_a, "a.jpg", 1)
+    add(worker_b, "b.jpg", 2)
+    add(worker_a, "c.jpg", 3)
+    worker_a.remove("c.jpg")
+    worker_a.compact()
+
+    # b.jpg was only ever in worker_b's memory
+    for index in (worker_a, worker_b, FaceIndex(tmp_path)):
+        assert filenames(index, 1) == ["a.jpg"]
+        assert filenames(index, 2) == ["b.jpg"]
+        assert filenames(index, 3) == []
+        assert len(index) == 2
+
+
+def test_remove_of_entry_added_by_other_worker(tmp_path):
+    worker_a, worker_b = FaceIndex(tmp_path), FaceIndex(tmp_path)
+    add(worker_b, "b.jpg", 2)
+    assert worker_a.remove("b.jpg") == 1
+    assert filenames(worker_b, 2) == []
+
+
+def test_compacts_once_enough_rows_are_dead(tmp_path, monkeypatch):
+    monkeypatch.setattr(face_index_module, "COMPACT_MIN_ROWS", 2)
+    index = FaceIndex(tmp_path)
+    for i in range(8):
+        add(index, f"{i}.jpg", i)
+    other = FaceIndex(tmp_path)
+    index.remove("0.jpg")
+    assert index.generation == 0
+    index.remove(["1.jpg"])
+    assert index.generation == 1 and len(index.ids) == 6
+    assert (tmp_path / "deleted.jsonl").stat().st_size == 0
+    assert (tmp_path / "embeddings.f32").stat().st_size == 6 * 128 * 4
+    # Row numbers changed: the other instance reloads instead of reading on
+    add(other, "new.jpg", 100)
+    assert filenames(index, 100) == ["new.jpg"]
+    assert filenames(other, 7) == ["7.jpg"] and filenames(other, 0) == []
+
+
+def test_re_added_capture_survives_older_tombstone(tmp_path):
+    index = FaceIndex(tmp_path)
+    add(index, "a.jpg", 1)
+    index.remove("a.jpg")
+    add(index, "a.jpg", 2)
+    reloaded = FaceIndex(tmp_path)
+    assert filenames(reloaded, 2) == ["a.jpg"] and filenames(reloaded, 1) == []
+
+
+def test_clear(tmp_path):
+    worker_a, worker_b = FaceIndex(tmp_path), FaceIndex(tmp_path)
+    add(worker_a, "a.jpg", 1)
+    worker_b.clear()
+    assert filenames(worker_a, 1) == [] and len(worker_a) == 0
+
+
+@pytest.mark.parametrize("torn", [b'{"filename": "x.jpg", "bo', b""])
+def test_torn_append_is_ignored_and_overwritten(tmp_path, torn):
+    index = FaceIndex(tmp_path)
+    add(index, "a.jpg", 1)
+    with open(tmp_path / "ids.jsonl", "ab") as f:
+        f.write(torn)
+    with open(tmp_path / "embeddings.f32", "ab") as f:
+        vec(9).tofile(f)  # vectors of an append whose ids never made it
+    fresh = FaceIndex(tmp_path)
+    assert len(fresh) == 1
+    add(fresh, "b.jpg", 2)
+    reloaded = FaceIndex(tmp_path)
+    assert filenames(reloaded, 2) == ["b.jpg"] and filenames(reloaded, 9) == []
+
+
+class FakeHnsw:
+    """Brute-force stand-in for hnswlib.Index, counting the rows it was given."""
+
+    def __init__(self, space, dim):
+        self.items = np.zeros((0, dim), dtype=np.float32)
+
+    def init_index(self, max_elements, **kwargs):
+        self.max_elements = max_elements
+
+    def set_ef(self, ef):
+        pass
+
+    def get_max_elements(self):
+        return self.max_elements
+
+    def resize_index(self, size):
+        self.max_elements = size
+
+    def add_items(self, data, labels):
+        assert list(labels) == list(range(len(self.items), len(self.items) + len(data)))
+        self.items = np.vstack([self.items, data])
+
+    def knn_query(self, query, k):
+        d = ((self.items[None, :, :] - query[:, None, :]) ** 2).sum(axis=2)
+        return np.argsort(d, axis=1)[:, :k], None
+
+
+def test_approximate_candidates_are_extended_incrementally(tmp_path, monkeypatch):
+    monkeypatch.setattr(face_index_module, "APPROX_THRESHOLD", 3)
+    index = FaceIndex(tmp_path)
+    index._hnswlib = type("hnswlib", (), {"Index": FakeHnsw})
+    for i in range(4):
+        add(index, f"{i}.jpg", i)
+    assert filenames(index, 2) == ["2.jpg"]
+    add(index, "4.jpg", 4)
+    assert filenames(index, 4) == ["4.jpg"]
+    assert len(index._approx.items) == 5
+
+
+def test_missing_hnswlib_falls_back_to_exact_search(tmp_path, monkeypatch):
+    monkeypatch.setattr(face_index_module, "APPROX_THRESHOLD", 1)
+    index = FaceIndex(tmp_path)
+    index._hnswlib = None
+    add(index, "a.jpg", 1)
+    assert filenames(index, 1) == ["a.jpg"] and index._approx is None
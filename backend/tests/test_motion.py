@@ -0,0 +1,53 @@
+# backend/tests/test_motion.py
+import cv2
+import numpy as np
+import pytest
+
+from motion import MAX_STATIC_S, MotionGate
+
+FACE = (240, 140, 160, 160)
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(1)
+    return cv2.GaussianBlur(rng.integers(60, 200, (480, 640), dtype=np.uint8), (7, 7), 0)
+
+
+def smile(frame, width, height, delta=40):
+    """Brightens a mouth-sized patch in the lower part of FACE."""
+    out = frame.copy()
+    x, y = FACE[0] + (FACE[2] - width) // 2, FACE[1] + 110
+    out[y:y+height, x:x+width] = np.clip(out[y:y+height, x:x+width].astype(int) + delta, 0, 255)
+    return out
+
+
+@pytest.mark.parametrize("size", [(60, 20), (80, 25)])
+def test_mouth_change_is_motion_inside_tracked_face(frame, size):
+    gate = MotionGate()
+    gate.update(frame, now=0.0)
+    assert gate.update(smile(frame, *size), rois=[FACE], now=0.1)
+
+
+@pytest.mark.parametrize("size", [(60, 20), (80, 25)])
+def test_mouth_change_is_below_whole_frame_threshold(frame, size):
+    gate = MotionGate()
+    gate.update(frame, now=0.0)
+    assert not gate.update(smile(frame, *size), now=0.1)
+    assert gate.last_changed < gate.min_changed
+
+
+def test_static_frame_with_face_stays_static(frame):
+    gate = MotionGate()
+    gate.update(frame, now=0.0)
+    assert not gate.update(frame.copy(), rois=[FACE], now=0.1)
+    assert gate.static_frames == 1
+
+
+def test_refresh_is_time_based(frame):
+    gate = MotionGate()
+    gate.update(frame, now=0.0)
+    for i in range(1, 100):  # many frames, but inside the refresh interval
+        assert not gate.update(frame, now=i * MAX_STATIC_S / 200)
+    assert gate.update(frame, now=MAX_STATIC_S)
+    assert gate.static_frames == 0
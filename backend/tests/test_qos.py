@@ -0,0 +1,40 @@
+# backend/tests/test_qos.py
+from qos import EMOTION_EVERY, LEVELS, QosGovernor
+
+
+def overloaded(level: int) -> QosGovernor:
+    qos = QosGovernor(budget_ms=10, degrade_frames=1)
+    while qos.level < level:
+        qos.record(100)
+    return qos
+
+
+def test_degrades_and_restores():
+    qos = QosGovernor(budget_ms=10, degrade_frames=2, restore_frames=3)
+    for _ in range(50):
+        qos.record(100)
+    assert qos.level == len(LEVELS) - 1
+    for _ in range(500):
+        qos.record(1)
+    assert qos.level == 0
+
+
+def test_emotion_runs_every_time_below_level_3():
+    qos = overloaded(2)
+    assert all(qos.run_emotion() for _ in range(10))
+
+
+def test_emotion_cadence_does_not_depend_on_frame_index():
+    # Passthrough analyses every third camera frame: shedding must still apply
+    qos = overloaded(3)
+    runs = [qos.run_emotion() for _ in range(4 * EMOTION_EVERY)]
+    assert sum(runs) == 4
+    assert runs[0]
+
+
+def test_stage_decisions_by_level():
+    assert QosGovernor().refresh_age_gender
+    qos = overloaded(2)
+    assert not qos.refresh_age_gender and qos.detect_scale < 1.0
+    assert qos.stream_fps(30) == 30
+    assert overloaded(4).stream_fps(30) == 15
@@ -0,0 +1,48 @@
+# backend/tests/test_quality.py
+import cv2
+import numpy as np
+import pytest
+
+from quality import BLUR_THRESHOLD, compute_face_metrics, face_sharpness, quality_flags
+
+BOX = (170, 90, 300, 300)  # a close-up face in a 640x480 frame
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    return cv2.GaussianBlur(rng.integers(0, 256, (480, 640), dtype=np.uint8), (3, 3), 0)
+
+
+def test_sharpness_matches_full_resolution_laplacian_variance(frame):
+    x, y, w, h = BOX
+    reference = cv2.Laplacian(frame[y:y+h, x:x+w], cv2.CV_64F).var()
+    assert face_sharpness(frame, BOX) == pytest.approx(reference)
+
+
+@pytest.mark.parametrize("kernel", [9, 15])
+def test_blurred_close_up_face_is_blurry(frame, kernel):
+    blurred = cv2.GaussianBlur(frame, (kernel, kernel), 0)
+    assert face_sharpness(blurred, BOX) < BLUR_THRESHOLD
+    flags = quality_flags(compute_face_metrics(blurred, [BOX]))
+    assert flags["is_blurry"][0] and not flags["is_ok"][0]
+
+
+def test_sharp_face_is_not_blurry(frame):
+    flags = quality_flags(compute_face_metrics(frame, [BOX]))
+    assert not flags["is_blurry"][0]
+
+
+def test_empty_box_scores_zero(frame):
+    assert face_sharpness(frame, (0, 0, 0, 0)) == 0.0
+    assert len(compute_face_metrics(frame, [])["sharpness"]) == 0
+
+
+def test_exposure_metrics_match_the_face_crop(frame):
+    boxes = [BOX, (600, 440, 80, 80)]  # the second one is clipped by the frame edge
+    metrics = compute_face_metrics(frame, boxes)
+    for i, (x, y, w, h) in enumerate(boxes):
+        crop = frame[y:y+h, x:x+w].astype(np.float64)
+        assert metrics["brightness"][i] == pytest.approx(crop.mean(), rel=1e-5)
+        assert metrics["contrast"][i] == pytest.approx(crop.std(), rel=1e-5)
+        assert metrics["size_ratio"][i] == pytest.approx(crop.size / frame.size)
@@ -0,0 +1,83 @@
+# backend/tests/test_result_cache.py
+import numpy as np
+
+import result_cache
+from result_cache import CachedModelManager, ResultCache, dhash, hamming
+
+
+class FakeManager:
+    active_age = active_gender = "model"
+
+    def __init__(self):
+        self.calls = {"emotion": 0, "age": 0, "gender": 0}
+
+    def predict_emotion_proba(self, face_img):
+        self.calls["emotion"] += 1
+        return "emotion"
+
+    def predict_age_proba(self, face_img):
+        self.calls["age"] += 1
+        return "age"
+
+    def predict_gender_proba(self, face_img):
+        self.calls["gender"] += 1
+        return "gender"
+
+
+def face(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+
+
+def test_near_match_within_tolerance():
+    cache = ResultCache(tolerance=4)
+    cache.put(0b1011, "a")
+    assert cache.get(0b1010) == "a"
+    assert cache.get(0b11110100) is None
+    assert hamming(0b1011, 0b0100) == 4
+
+
+def test_ttl_expiry():
+    cache = ResultCache(ttl=0.0)
+    cache.put(1, "a")
+    assert cache.get(1) is None
+
+
+def test_emotion_only_entry_does_not_hide_age_gender():
+    mgr = CachedModelManager(FakeManager(), ResultCache())
+    img = face()
+    partial = mgr.predict_proba_all(img, age_gender=False)
+    assert partial["age"] is None and partial["gender"] is None
+
+    full = mgr.predict_proba_all(img, age_gender=True)
+    assert full == {"emotion": "emotion", "age": "age", "gender": "gender"}
+    assert mgr.manager.calls == {"emotion": 1, "age": 1, "gender": 1}
+
+    # The entry is complete now: later calls are plain hits
+    assert mgr.predict_proba_all(img) == full
+    assert mgr.manager.calls == {"emotion": 1, "age": 1, "gender": 1}
+
+
+def test_near_hit_completion_updates_the_matched_entry(monkeypatch):
+    cache = ResultCache(tolerance=4)
+    mgr = CachedModelManager(FakeManager(), cache)
+    monkeypatch.setattr(result_cache, "dhash", lambda img: 0b1011)
+    mgr.predict_proba_all(face(), age_gender=False)
+    monkeypatch.setattr(result_cache, "dhash", lambda img: 0b1010)  # near hit
+    mgr.predict_proba_all(face(), age_gender=True)
+
+    assert cache.stats()["size"] == 1
+    assert cache.get_item(0b1011)[1]["age"] == "age"
+
+
+def test_missing_age_model_is_not_retried():
+    manager = FakeManager()
+    manager.active_age = manager.active_gender = None
+    mgr = CachedModelManager(manager, ResultCache())
+    img = face()
+    mgr.predict_proba_all(img, age_gender=False)
+    mgr.predict_proba_all(img, age_gender=True)
+    assert manager.calls == {"emotion": 1, "age": 0, "gender": 0}
+
+
+def test_dhash_is_stable_for_same_crop():
+    assert dhash(face(1)) == dhash(face(1).copy())
@@ -0,0 +1,47 @@
+# backend/tests/test_smile_gate.py
+import os
+
+import numpy as np
+import pytest
+
+from smile_gate import SMILE_CASCADE_PATH, SmileCascade, SmileGate
+
+BOX = (0, 0, 100, 100)
+GRAY = np.zeros((120, 120), dtype=np.uint8)
+
+
+class FakeCascade:
+    def __init__(self, hits):
+        self.hits = iter(hits)
+
+    def detect(self, gray, box):
+        return next(self.hits)
+
+
+def decisions(hits, refresh_interval=3, track_id=1):
+    gate = SmileGate(FakeCascade(hits), refresh_interval=refresh_interval)
+    return [gate.should_run(track_id, GRAY, BOX) for _ in hits], gate
+
+
+def test_new_track_runs_once_then_refreshes_on_interval():
+    runs, gate = decisions([False] * 9)
+    assert runs == [True, False, False, False, True, False, False, False, True]
+    assert gate.stats()["gated"] == 6
+
+
+def test_runs_on_cascade_hit_and_on_hit_to_miss_transition():
+    runs, _ = decisions([False, False, True, True, False, False], refresh_interval=10)
+    assert runs == [True, False, True, True, True, False]
+
+
+def test_prune_forgets_tracks():
+    gate = SmileGate(FakeCascade([False] * 3), refresh_interval=10)
+    gate.should_run(1, GRAY, BOX)
+    assert not gate.should_run(1, GRAY, BOX)
+    gate.prune([2])
+    assert gate.should_run(1, GRAY, BOX)  # a new track again
+
+
+@pytest.mark.skipif(not os.path.exists(SMILE_CASCADE_PATH), reason="smile cascade not bundled")
+def test_cascade_finds_no_smile_in_flat_face():
+    assert not SmileCascade().detect(np.full((200, 200), 128, dtype=np.uint8), (20, 20, 160, 160))
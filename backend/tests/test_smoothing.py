@@ -0,0 +1,67 @@
+# backend/tests/test_smoothing.py
+import numpy as np
+import pytest
+
+from smoothing import FaceSmoother, FaceTracker, iou_matrix
+
+LABELS = ["neutral", "happiness", "surprise"]
+
+
+def probs(happiness):
+    return np.array([1.0 - happiness, happiness, 0.0], dtype=np.float32)
+
+
+def test_iou_matrix():
+    ious = iou_matrix([(0, 0, 10, 10)], [(0, 0, 10, 10), (5, 0, 10, 10), (20, 20, 5, 5)])
+    assert ious[0] == pytest.approx([1.0, 1 / 3, 0.0])
+
+
+def test_tracker_keeps_ids_and_expires_missing_tracks():
+    tracker = FaceTracker(max_missed=2)
+    ids, _ = tracker.update([(0, 0, 50, 50), (200, 0, 50, 50)])
+    moved, _ = tracker.update([(205, 2, 50, 50), (3, 1, 50, 50)])
+    assert moved == [ids[1], ids[0]]
+    expired = []
+    for _ in range(3):
+        expired += tracker.update([(0, 0, 50, 50)])[1]
+    assert expired == [ids[1]]
+
+
+def test_smile_hysteresis():
+    smoother = FaceSmoother(LABELS, alpha=1.0, smile_threshold=0.7, hysteresis=0.15)
+    tid = smoother.update_tracks([(0, 0, 50, 50)])[0]
+    expected = [(0.69, False), (0.72, True), (0.60, True), (0.56, True), (0.54, False), (0.65, False)]
+    for happiness, smiling in expected:
+        smoother.update(tid, emotion=probs(happiness))
+        assert smoother.result(tid)["is_smiling"] is smiling, happiness
+
+
+def test_ema_smooths_a_single_outlier():
+    smoother = FaceSmoother(LABELS, alpha=0.4, smile_threshold=0.7)
+    tid = smoother.update_tracks([(0, 0, 50, 50)])[0]
+    for _ in range(10):
+        smoother.update(tid, emotion=probs(0.95))
+    smoother.update(tid, emotion=probs(0.0))
+    result = smoother.result(tid)
+    assert result["emotion"] == "happiness" and result["is_smiling"]
+
+
+def test_stable_tracks_skip_inference_until_refresh():
+    smoother = FaceSmoother(LABELS, stable_frames=3, max_skip=4)
+    tid = smoother.update_tracks([(0, 0, 50, 50)])[0]
+    while smoother.should_infer(tid):
+        smoother.update(tid, emotion=probs(0.2))
+    for _ in range(4):
+        smoother.skip(tid)
+    assert smoother.should_infer(tid)
+
+
+def test_needs_age_gender_until_both_are_known():
+    smoother = FaceSmoother(LABELS, age_labels=["young", "old"], gender_labels=["m", "f"])
+    tid = smoother.update_tracks([(0, 0, 50, 50)])[0]
+    assert smoother.needs_age_gender(tid)
+    smoother.update(tid, emotion=probs(0.1), age=[0.2, 0.8])
+    assert smoother.needs_age_gender(tid)
+    smoother.update(tid, gender=[0.9, 0.1])
+    assert not smoother.needs_age_gender(tid)
+    assert smoother.result(tid)["age"] == "old" and smoother.result(tid)["gender"] == "m"
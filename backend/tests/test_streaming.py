@@ -0,0 +1,42 @@
+# backend/tests/test_streaming.py
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("av")
+
+from streaming import VideoBroadcaster, forward_to_websocket  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+def test_unsubscribe_ends_forwarding_and_others_keep_receiving():
+    async def scenario():
+        broadcaster = VideoBroadcaster("vp8", fps=30)
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        broadcaster.publish(frame, {"ts": 1})
+
+        first_ws = FakeWebSocket()
+        broadcaster.unsubscribe(first)
+        await asyncio.wait_for(forward_to_websocket(first_ws, first), 1.0)  # returns: stream ended
+        assert broadcaster.viewers == [second]
+
+        broadcaster.publish(frame, {"ts": 2})
+        broadcaster.close()
+        second_ws = FakeWebSocket()
+        await asyncio.wait_for(forward_to_websocket(second_ws, second), 1.0)
+        assert [m for m in second_ws.sent if isinstance(m, dict)] == [{"ts": 1}, {"ts": 2}]
+        assert isinstance(second_ws.sent[0], bytes) and second_ws.sent[0][0] == 1  # starts on a keyframe
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+# backend/tests/test_tracing.py
+import gc
+import json
+
+import pytest
+
+from tracing import _NOOP, MAX_TRACE_CAPACITY, Tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    assert tracer.span("detect") is _NOOP and tracer.now() == 0
+    tracer.complete("frame", tracer.now())
+    assert len(tracer.events) == 0
+
+
+def test_ring_buffer_keeps_newest_spans():
+    tracer = Tracer()
+    tracer.start(capacity=3)
+    try:
+        for i in range(5):
+            with tracer.span("stage", index=i):
+                pass
+    finally:
+        tracer.stop()
+    assert [e[5]["index"] for e in tracer.events] == [2, 3, 4]
+
+
+def test_chrome_export_and_gc_spans():
+    tracer = Tracer()
+    tracer.start()
+    try:
+        t0 = tracer.now()
+        with tracer.span("detect", cat="stage"):
+            gc.collect()
+        tracer.complete("frame", t0, cat="frame", frame=1)
+    finally:
+        tracer.stop()
+    trace = json.loads(json.dumps(tracer.export_chrome()))
+    names = [e["name"] for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert {"detect", "frame", "gc"} <= set(names)
+    assert all(e["dur"] >= 0 for e in trace["traceEvents"] if e["ph"] == "X")
+
+
+@pytest.mark.parametrize("capacity", [0, -1, MAX_TRACE_CAPACITY + 1])
+def test_start_rejects_invalid_capacity(capacity):
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        tracer.start(capacity)
+    assert not tracer.enabled
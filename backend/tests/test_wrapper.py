@@ -0,0 +1,57 @@
+# backend/tests/test_wrapper.py
+import logging
+
+import numpy as np
+import pytest
+
+from wrapper import Prediction, logger, set_log_level, softmax
+
+
+def test_set_log_level_accepts_known_names():
+    previous = logger.level
+    try:
+        assert set_log_level("debug") == "DEBUG"
+        assert logger.level == logging.DEBUG
+    finally:
+        logger.setLevel(previous)
+
+
+@pytest.mark.parametrize("level", ["LOUD", "", 5, None])
+def test_set_log_level_rejects_unknown_levels(level):
+    previous = logger.level
+    with pytest.raises(ValueError):
+        set_log_level(level)
+    assert logger.level == previous
+
+
+def test_unknown_env_log_level_falls_back_to_info(monkeypatch, capsys):
+    import importlib
+    import wrapper
+    monkeypatch.setenv("SMILAGE_LOG_LEVEL", "verbose")
+    try:
+        importlib.reload(wrapper)
+        assert wrapper.logger.level == logging.INFO
+        assert "SMILAGE_LOG_LEVEL" in capsys.readouterr().out
+    finally:
+        monkeypatch.delenv("SMILAGE_LOG_LEVEL")
+        importlib.reload(wrapper)
+
+
+def test_softmax_is_stable_for_large_logits():
+    probs = softmax(np.array([1000.0, 1001.0, 1002.0], dtype=np.float32))
+    assert np.all(np.isfinite(probs))
+    assert probs.sum() == pytest.approx(1.0)
+    assert probs == pytest.approx([0.09003057, 0.24472847, 0.66524096], rel=1e-5)
+
+
+def test_softmax_works_in_place_on_float32_buffers():
+    scores = np.array([0.0, 0.0], dtype=np.float32)
+    assert softmax(scores) is scores
+    assert scores == pytest.approx([0.5, 0.5])
+
+
+def test_prediction_unpacks_like_the_old_tuple():
+    label, confidence = Prediction("happiness", 0.9, probs=np.ones(8), elapsed_ms=1.5)
+    assert (label, confidence) == ("happiness", 0.9)
+    with pytest.raises(AttributeError):
+        Prediction().extra = 1  # __slots__
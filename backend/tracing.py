@@ -0,0 +1,148 @@
+# backend/tracing.py
+"""
+Opt-in span tracing for tail-latency analysis.
+
+Spans (per frame and per stage: capture, detect, each model, encode, send)
+and garbage-collector pauses are kept in a fixed-size ring buffer and
+exported as Chrome trace JSON, which chrome://tracing and
+https://ui.perfetto.dev open directly.
+
+Disabled (the default) every call is a single attribute check: `span()`
+returns a shared no-op context manager and `now()` returns 0, so the
+instrumentation can stay in the hot path.
+
+    with tracer.span("detect"):
+        faces = detector.detect(gray)
+
+    t0 = tracer.now()
+    ...
+    tracer.complete("frame", t0, frame=index)
+"""
+
+import gc
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# -------------------------
+# Defaults
+# -------------------------
+TRACE_CAPACITY = 50_000        # Spans kept in the ring buffer (oldest are dropped)
+MAX_TRACE_CAPACITY = 1_000_000 # Upper bound for a requested capacity (~250 MB of spans)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._record(self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Tracer:
+    def __init__(self, capacity: int = TRACE_CAPACITY):
+        self.enabled = False
+        self.events = deque(maxlen=capacity)
+        self._gc_start = None
+
+    # -------------------------
+    # Control
+    # -------------------------
+    def start(self, capacity: int = None):
+        """Clears the buffer and starts recording (including GC pauses). Raises ValueError."""
+        if capacity is not None and not 0 < capacity <= MAX_TRACE_CAPACITY:
+            raise ValueError(f"Trace capacity must be in 1..{MAX_TRACE_CAPACITY}, got {capacity}")
+        if capacity:
+            self.events = deque(maxlen=capacity)
+        else:
+            self.events.clear()
+        if self._on_gc not in gc.callbacks:
+            gc.callbacks.append(self._on_gc)
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    # -------------------------
+    # Recording
+    # -------------------------
+    def span(self, name: str, cat: str = "stage", **args):
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, cat, args)
+
+    def now(self) -> int:
+        """Start timestamp for complete(); 0 when disabled."""
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def complete(self, name: str, start_ns: int, cat: str = "stage", **args):
+        """Records a span from `start_ns` (from now()) until now."""
+        if self.enabled and start_ns:
+            self._record(name, cat, start_ns, time.perf_counter_ns(), args)
+
+    def _record(self, name, cat, start_ns, end_ns, args):
+        # deque.append is atomic, so worker threads can record too
+        self.events.append((name, cat, start_ns, end_ns - start_ns, threading.get_ident(), args))
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_start = time.perf_counter_ns()
+        elif self._gc_start is not None:
+            self._record("gc", "gc", self._gc_start, time.perf_counter_ns(),
+                         {"generation": info.get("generation"), "collected": info.get("collected")})
+            self._gc_start = None
+
+    # -------------------------
+    # Export
+    # -------------------------
+    def export_chrome(self) -> dict:
+        """Chrome trace event format ("X" complete events, microseconds)."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "smilage"}}]
+        for name, cat, start_ns, dur_ns, tid, args in list(self.events):
+            event = {"name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+                     "ts": start_ns / 1000.0, "dur": dur_ns / 1000.0}
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str) -> int:
+        """Writes the Chrome trace JSON to `path`; returns the number of spans."""
+        trace = self.export_chrome()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        return len(trace["traceEvents"]) - 1
+
+
+# Process-wide tracer used by the server, the model wrappers and the tools
+tracer = Tracer(int(os.environ.get("SMILAGE_TRACE_CAPACITY", TRACE_CAPACITY)))
+if os.environ.get("SMILAGE_TRACE", "0") == "1":
+    tracer.start()
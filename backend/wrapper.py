@@ -1,17 +1,102 @@
 # backend/wrapper.py
 
 import cv2
+import logging
 import numpy as np
 import os
 from abc import ABC, abstractmethod
 import time
 
+from tracing import tracer
+
 # Optional ONNX import
 try:
     import onnxruntime as ort
 except Exception:
     ort = None
 
+# -------------------------
+# Logging
+# -------------------------
+# Per-frame debug output (e.g. full emotion scores) is logged at DEBUG level,
+# so it costs nothing unless enabled. Level comes from SMILAGE_LOG_LEVEL and
+# can be changed at runtime with set_log_level().
+logger = logging.getLogger("smilage")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+def set_log_level(level: str) -> str:
+    """Change the wrapper log level at runtime (one of LOG_LEVELS). Raises ValueError."""
+    name = str(level).upper()
+    if name not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level {level!r}, expected one of {', '.join(LOG_LEVELS)}")
+    logger.setLevel(name)
+    return name
+
+
+try:
+    set_log_level(os.environ.get("SMILAGE_LOG_LEVEL", "INFO"))
+except ValueError as e:
+    # A typo in the environment must not keep the server from starting
+    print(f"[WARN] SMILAGE_LOG_LEVEL: {e}; using INFO")
+    set_log_level("INFO")
+
+
+# -------------------------
+# Model load mode
+# -------------------------
+# "default": each process loads and owns its copy of the weights.
+# "shared":  load for sharing between worker processes. Load before fork
+#            (e.g. gunicorn --preload, see gunicorn_conf.py) so weight pages
+#            stay shared copy-on-write. FER+ external-data weights are
+#            memory-mapped by onnxruntime and used in place (no prepacking),
+#            and every model runs one warm-up pass so lazily allocated
+#            buffers are created before the fork too.
+MODEL_LOAD_MODE = os.environ.get("SMILAGE_MODEL_LOAD_MODE", "default")
+
+
+# -------------------------
+# Prediction result
+# -------------------------
+class Prediction:
+    """
+    Result of a single model call.
+    Unpacks like the old `(label, confidence)` tuple: `label, conf = model.predict(img)`.
+    """
+    __slots__ = ("label", "confidence", "probs", "elapsed_ms")
+
+    def __init__(self, label=None, confidence=0.0, probs=None, elapsed_ms=0.0):
+        self.label = label
+        self.confidence = confidence
+        self.probs = probs
+        self.elapsed_ms = elapsed_ms
+
+    def __iter__(self):
+        yield self.label
+        yield self.confidence
+
+    def __repr__(self):
+        return f"Prediction(label={self.label!r}, confidence={self.confidence:.3f}, elapsed_ms={self.elapsed_ms:.2f})"
+
+
+def softmax(scores: np.ndarray):
+    """
+    Numerically stable softmax (max-subtracted).
+    Works in place when `scores` is already a float32 array, so pass a buffer you own.
+    """
+    probs = np.asarray(scores, dtype=np.float32)
+    probs -= probs.max()
+    np.exp(probs, out=probs)
+    probs /= probs.sum()
+    return probs
+
 
 # -------------------------
 # Base classes
@@ -56,13 +141,16 @@ class EmotionFERPlus(BaseEmotionModel):
         "anger", "disgust", "fear", "contempt"
     ]
 
-    def __init__(self, model_path="models/emotion-ferplus.onnx", emotions=None, providers=None):
+    def __init__(self, model_path="models/emotion-ferplus.onnx", emotions=None, providers=None,
+                 load_mode=None):
         super().__init__("FERPlus")
         self.model_path = model_path
         self.session = None
         self.input_name = None
         self.emotions = emotions or self.DEFAULT_EMOTIONS
+        self.labels = self.emotions
         self.providers = providers
+        self.load_mode = load_mode or MODEL_LOAD_MODE
         self.load()
 
     def load(self):
@@ -71,10 +159,20 @@ class EmotionFERPlus(BaseEmotionModel):
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"FER model not found: {self.model_path}")
         try:
-            self.session = ort.InferenceSession(self.model_path, providers=self.providers or ["CPUExecutionProvider"])
+            opts = ort.SessionOptions()
+            if self.load_mode == "shared":
+                # Keep weights in the mmap'd / pre-fork buffers instead of per-process packed copies
+                opts.add_session_config_entry("session.disable_prepacking", "1")
+                # ORT thread pools do not survive fork(); run ops on the calling thread
+                opts.intra_op_num_threads = 1
+                opts.inter_op_num_threads = 1
+            self.session = ort.InferenceSession(self.model_path, sess_options=opts,
+                                                providers=self.providers or ["CPUExecutionProvider"])
             self.input_name = self.session.get_inputs()[0].name
         except Exception as e:
             raise RuntimeError(f"Failed to load FER ONNX model: {e}")
+        if self.load_mode == "shared":
+            self.session.run(None, {self.input_name: np.zeros((1, 1, 64, 64), dtype=np.float32)})
 
     def preprocess(self, face_img: np.ndarray):
         gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
@@ -86,29 +184,30 @@ class EmotionFERPlus(BaseEmotionModel):
         
         return processed_input.reshape(1, 1, 64, 64)
 
+    def predict_proba(self, face_img: np.ndarray):
+        inp = self.preprocess(face_img)
+        outputs = self.session.run(None, {self.input_name: inp})
+        scores = outputs[0][0]
+
+        # Apply softmax to get confidence as a probability
+        return softmax(scores)
+
     def predict(self, face_img: np.ndarray):
+        start = time.perf_counter()
         try:
-            inp = self.preprocess(face_img)
-            outputs = self.session.run(None, {self.input_name: inp})
-            scores = outputs[0][0]
-            
-            # Apply softmax to get confidence as a probability
-            prob = np.exp(scores) / np.sum(np.exp(scores))
-            
-            # NEW DEBUG PRINT: This is the most important step.
-            # It will show us the confidence score for every emotion.
-            print(f"[DEBUG Emotion Scores]: {list(zip(self.emotions, np.round(prob, 2)))}")
+            prob = self.predict_proba(face_img)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Emotion scores: %s", list(zip(self.emotions, np.round(prob, 2))))
 
             idx = int(np.argmax(prob))
-            label = self.emotions[idx]
-            confidence = float(prob[idx])
-            return label, confidence
+            return Prediction(self.emotions[idx], float(prob[idx]), prob,
+                              (time.perf_counter() - start) * 1000)
         except Exception as e:
-            print(f"[ERROR] FER predict failed: {e}")
-            return "error", 0.0
+            logger.error("FER predict failed: %s", e)
+            return Prediction("error", 0.0)
 
 
-# --- The rest of the file remains the same ---
 # -------------------------
 # Age model: Caffe DNN
 # -------------------------
@@ -116,8 +215,11 @@ class AgeCaffeNet(BaseAgeModel):
     AGE_BUCKETS = ['(0-2)', '(4-6)', '(8-12)', '(15-20)',
                    '(25-32)', '(38-43)', '(48-53)', '(60-100)']
 
-    def __init__(self, proto="models/age_deploy.prototxt", model="models/age_net.caffemodel"):
+    def __init__(self, proto="models/age_deploy.prototxt", model="models/age_net.caffemodel",
+                 load_mode=None):
         super().__init__("CaffeAgeNet")
+        self.load_mode = load_mode or MODEL_LOAD_MODE
+        self.labels = self.AGE_BUCKETS
         self.proto = proto
         self.model = model
         self.net = None
@@ -127,6 +229,9 @@ class AgeCaffeNet(BaseAgeModel):
         if not os.path.exists(self.proto) or not os.path.exists(self.model):
             raise FileNotFoundError(f"Age model/proto not found: {self.proto}, {self.model}")
         self.net = cv2.dnn.readNetFromCaffe(self.proto, self.model)
+        if self.load_mode == "shared":
+            # OpenCV allocates fused weights/blobs on the first forward: do it before fork
+            self.predict_proba(np.zeros((227, 227, 3), dtype=np.uint8))
 
     def preprocess(self, face_img: np.ndarray):
         blob = cv2.dnn.blobFromImage(face_img, 1.0, (227, 227),
@@ -134,16 +239,21 @@ class AgeCaffeNet(BaseAgeModel):
                                      swapRB=False)
         return blob
 
+    def predict_proba(self, face_img: np.ndarray):
+        blob = self.preprocess(face_img)
+        self.net.setInput(blob)
+        return self.net.forward()[0].ravel()
+
     def predict(self, face_img: np.ndarray):
+        start = time.perf_counter()
         try:
-            blob = self.preprocess(face_img)
-            self.net.setInput(blob)
-            preds = self.net.forward()[0]
+            preds = self.predict_proba(face_img)
             idx = int(np.argmax(preds))
-            return self.AGE_BUCKETS[idx], float(preds[idx])
+            return Prediction(self.AGE_BUCKETS[idx], float(preds[idx]), preds,
+                              (time.perf_counter() - start) * 1000)
         except Exception as e:
-            print(f"[ERROR] Age predict failed: {e}")
-            return None, 0.0
+            logger.error("Age predict failed: %s", e)
+            return Prediction(None, 0.0)
 
 
 # -------------------------
@@ -152,8 +262,11 @@ class AgeCaffeNet(BaseAgeModel):
 class GenderCaffeNet(BaseGenderModel):
     GENDER_LIST = ['Male', 'Female']
 
-    def __init__(self, proto="models/gender_deploy.prototxt", model="models/gender_net.caffemodel"):
+    def __init__(self, proto="models/gender_deploy.prototxt", model="models/gender_net.caffemodel",
+                 load_mode=None):
         super().__init__("CaffeGenderNet")
+        self.load_mode = load_mode or MODEL_LOAD_MODE
+        self.labels = self.GENDER_LIST
         self.proto = proto
         self.model = model
         self.net = None
@@ -163,6 +276,9 @@ class GenderCaffeNet(BaseGenderModel):
         if not os.path.exists(self.proto) or not os.path.exists(self.model):
             raise FileNotFoundError(f"Gender model/proto not found: {self.proto}, {self.model}")
         self.net = cv2.dnn.readNetFromCaffe(self.proto, self.model)
+        if self.load_mode == "shared":
+            # OpenCV allocates fused weights/blobs on the first forward: do it before fork
+            self.predict_proba(np.zeros((227, 227, 3), dtype=np.uint8))
 
     def preprocess(self, face_img: np.ndarray):
         blob = cv2.dnn.blobFromImage(face_img, 1.0, (227, 227),
@@ -170,16 +286,21 @@ class GenderCaffeNet(BaseGenderModel):
                                      swapRB=False)
         return blob
 
+    def predict_proba(self, face_img: np.ndarray):
+        blob = self.preprocess(face_img)
+        self.net.setInput(blob)
+        return self.net.forward()[0].ravel()
+
     def predict(self, face_img: np.ndarray):
+        start = time.perf_counter()
         try:
-            blob = self.preprocess(face_img)
-            self.net.setInput(blob)
-            preds = self.net.forward()[0]
+            preds = self.predict_proba(face_img)
             idx = int(np.argmax(preds))
-            return self.GENDER_LIST[idx], float(preds[idx])
+            return Prediction(self.GENDER_LIST[idx], float(preds[idx]), preds,
+                              (time.perf_counter() - start) * 1000)
         except Exception as e:
-            print(f"[ERROR] Gender predict failed: {e}")
-            return None, 0.0
+            logger.error("Gender predict failed: %s", e)
+            return Prediction(None, 0.0)
 
 
 # -------------------------
@@ -232,15 +353,49 @@ class ModelManager:
     # Predict helpers
     def predict_emotion(self, face_img: np.ndarray):
         if not self.active_emotion:
-            return None, 0.0
-        return self.active_emotion.predict(face_img)
+            return Prediction(None, 0.0)
+        with tracer.span("emotion", cat="model"):
+            return self.active_emotion.predict(face_img)
 
     def predict_age(self, face_img: np.ndarray):
         if not self.active_age:
-            return None, 0.0
-        return self.active_age.predict(face_img)
+            return Prediction(None, 0.0)
+        with tracer.span("age", cat="model"):
+            return self.active_age.predict(face_img)
 
     def predict_gender(self, face_img: np.ndarray):
         if not self.active_gender:
-            return None, 0.0
-        return self.active_gender.predict(face_img)
\ No newline at end of file
+            return Prediction(None, 0.0)
+        with tracer.span("gender", cat="model"):
+            return self.active_gender.predict(face_img)
+
+    # Probability helpers (full class vectors, for smoothing)
+    def predict_emotion_proba(self, face_img: np.ndarray):
+        if not self.active_emotion:
+            return None
+        try:
+            with tracer.span("emotion", cat="model"):
+                return self.active_emotion.predict_proba(face_img)
+        except Exception as e:
+            logger.error("Emotion predict failed: %s", e)
+            return None
+
+    def predict_age_proba(self, face_img: np.ndarray):
+        if not self.active_age:
+            return None
+        try:
+            with tracer.span("age", cat="model"):
+                return self.active_age.predict_proba(face_img)
+        except Exception as e:
+            logger.error("Age predict failed: %s", e)
+            return None
+
+    def predict_gender_proba(self, face_img: np.ndarray):
+        if not self.active_gender:
+            return None
+        try:
+            with tracer.span("gender", cat="model"):
+                return self.active_gender.predict_proba(face_img)
+        except Exception as e:
+            logger.error("Gender predict failed: %s", e)
+            return None
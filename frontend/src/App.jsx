@@ -10,10 +10,16 @@ import Gallery from "./components/Gallery.jsx";
 import SettingsPanel from "./components/SettingsPanel.jsx";
 import GalleryModal from "./components/GalleryModal.jsx";
 
+// Optional video-codec stream instead of per-frame JPEG ("" = JPEG, "h264" or "vp8").
+// Needs WebCodecs in the browser; falls back to JPEG otherwise.
+const STREAM_CODEC = import.meta.env.VITE_STREAM_CODEC || "";
+const WEBCODECS_CODECS = { h264: "avc1.42001f", vp8: "vp8" };
+
 function App() {
   // --- State Management ---
   const [isConnected, setIsConnected] = useState(false);
   const [predictions, setPredictions] = useState({});
+  const [qosLevel, setQosLevel] = useState(0);
   const [overlay, setOverlay] = useState("");
   const [galleryImages, setGalleryImages] = useState([]);
   const [isGalleryOpen, setIsGalleryOpen] = useState(false);
@@ -26,8 +32,9 @@ function App() {
   });
 
   // --- Refs ---
-  const canvasRef = useRef(null);
+  const feedRef = useRef(null);
   const wsRef = useRef(null);
+  const decoderRef = useRef(null);
   const overlayTimeoutRef = useRef(null);
 
   // --- Helper Functions ---
@@ -85,28 +92,46 @@ function App() {
     if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) return;
 
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${wsProtocol}//${window.location.host}/ws/video`;
+    const useCodec = STREAM_CODEC in WEBCODECS_CODECS && "VideoDecoder" in window;
+    const wsUrl = `${wsProtocol}//${window.location.host}/ws/video${useCodec ? `?codec=${STREAM_CODEC}` : ""}`;
     wsRef.current = new WebSocket(wsUrl);
 
+    if (useCodec) {
+      wsRef.current.binaryType = "arraybuffer";
+      decoderRef.current = new VideoDecoder({
+        // Painted (and closed) by the frame worker
+        output: (videoFrame) => {
+          if (feedRef.current) feedRef.current.drawVideoFrame(videoFrame);
+          else videoFrame.close();
+        },
+        error: (error) => console.error("Video decode error: ", error),
+      });
+      decoderRef.current.configure({ codec: WEBCODECS_CODECS[STREAM_CODEC], optimizeForLatency: true });
+    }
+
     wsRef.current.onopen = () => setIsConnected(true);
 
     wsRef.current.onmessage = (event) => {
+      // Binary message = encoded video packet: [keyframe flag byte][bitstream]
+      if (event.data instanceof ArrayBuffer) {
+        const bytes = new Uint8Array(event.data);
+        if (decoderRef.current?.state === "configured") {
+          decoderRef.current.decode(new EncodedVideoChunk({
+            type: bytes[0] === 1 ? "key" : "delta",
+            timestamp: Math.round(performance.now() * 1000),
+            data: bytes.subarray(1),
+          }));
+        }
+        return;
+      }
+
       const data = JSON.parse(event.data);
       
-      if (data.frame && canvasRef.current) {
-        const ctx = canvasRef.current.getContext("2d");
-        const img = new Image();
-        img.src = "data:image/jpeg;base64," + data.frame;
-        img.onload = () => {
-          if (canvasRef.current) {
-            canvasRef.current.width = img.width;
-            canvasRef.current.height = img.height;
-            ctx.drawImage(img, 0, 0, img.width, img.height);
-          }
-        };
-      }
+      if (data.error) console.warn("Server:", data.error);
+      if (data.frame) feedRef.current?.drawJpeg(data.frame);
       
       if (data.predictions) setPredictions(data.predictions);
+      if (data.qos !== undefined) setQosLevel(data.qos);
       
       if (data.capture) {
         setOverlayMessage("Selfie Captured! 📸");
@@ -126,10 +151,9 @@ function App() {
     
     wsRef.current.onclose = () => {
       setIsConnected(false);
-      const ctx = canvasRef.current?.getContext("2d");
-      if (canvasRef.current) {
-        ctx.clearRect(0, 0, canvasRef.current.width, canvasRef.current.height);
-      }
+      if (decoderRef.current && decoderRef.current.state !== "closed") decoderRef.current.close();
+      decoderRef.current = null;
+      feedRef.current?.clear();
     };
     
     wsRef.current.onerror = (error) => console.error("WebSocket Error: ", error);
@@ -145,6 +169,13 @@ function App() {
     }
   };
 
+  // Client-side decode/paint timings from the frame worker, reported to /api/metrics
+  const handleRenderStats = (stats) => {
+    if (wsRef.current?.readyState === WebSocket.OPEN) {
+      wsRef.current.send(JSON.stringify({ action: "client_metrics", ...stats }));
+    }
+  };
+
   const handleSettingChange = (event) => {
     const { name, value } = event.target;
     setSettings(prev => ({ ...prev, [name]: value }));
@@ -168,7 +199,7 @@ function App() {
       <div className="left-panel">
         <h1>Smilage Selfie Capture</h1>
         <div className="camera-container">
-          <CameraFeed ref={canvasRef} />
+          <CameraFeed ref={feedRef} onStats={handleRenderStats} />
           <OverlayMessage message={overlay} />
         </div>
         <Controls
@@ -178,7 +209,7 @@ function App() {
           onCapture={handleManualCapture}
           onSettingsClick={() => setIsSettingsOpen(true)}
         />
-        <PredictionPanel predictions={predictions} />
+        <PredictionPanel predictions={predictions} qosLevel={qosLevel} />
       </div>
 
       <div className="right-panel">
@@ -1,7 +1,87 @@
-import React, { forwardRef } from "react";
+import React, { forwardRef, useEffect, useImperativeHandle, useRef } from "react";
+import { createFrameRenderer } from "../render/frameRenderer.js";
 
-const CameraFeed = forwardRef((props, ref) => {
-  return <canvas ref={ref} className="camera-feed" />;
+const STATS_INTERVAL_MS = 2000;
+const SUPPORTS_OFFSCREEN =
+  typeof Worker !== "undefined" && "transferControlToOffscreen" in HTMLCanvasElement.prototype;
+
+// Live view. Frames are decoded and painted in a Web Worker on a transferred
+// OffscreenCanvas (main-thread fallback otherwise). A frame that arrives while
+// the previous one is still decoding is dropped. Decode/paint timings are
+// passed to `onStats` every STATS_INTERVAL_MS.
+const CameraFeed = forwardRef(({ onStats }, ref) => {
+  const canvasRef = useRef(null);
+  const workerRef = useRef(null);
+  const rendererRef = useRef(null); // main-thread fallback
+  const busyRef = useRef(false);
+  const droppedRef = useRef(0);
+  const onStatsRef = useRef(onStats);
+  onStatsRef.current = onStats;
+
+  const report = (stats) => {
+    if (stats.frames || droppedRef.current) {
+      onStatsRef.current?.({ ...stats, dropped: droppedRef.current });
+    }
+    droppedRef.current = 0;
+  };
+
+  // Created on the first frame: a canvas can be transferred only once
+  const ensureRenderer = () => {
+    if (workerRef.current || rendererRef.current) return;
+    if (SUPPORTS_OFFSCREEN) {
+      const worker = new Worker(new URL("../render/frameRenderer.worker.js", import.meta.url), { type: "module" });
+      const offscreen = canvasRef.current.transferControlToOffscreen();
+      worker.postMessage({ type: "init", canvas: offscreen }, [offscreen]);
+      worker.onmessage = (event) => {
+        if (event.data.type === "ready") busyRef.current = false;
+        else if (event.data.type === "stats") report(event.data.stats);
+      };
+      workerRef.current = worker;
+    } else {
+      rendererRef.current = createFrameRenderer(canvasRef.current);
+    }
+  };
+
+  const submit = (msg, transfer = []) => {
+    ensureRenderer();
+    if (busyRef.current) {
+      droppedRef.current += 1;
+      if (msg.frame) msg.frame.close();
+      return;
+    }
+    busyRef.current = true;
+    if (workerRef.current) {
+      workerRef.current.postMessage(msg, transfer);
+    } else {
+      rendererRef.current.render(msg)
+        .catch((error) => console.error("Frame render error: ", error))
+        .finally(() => { busyRef.current = false; });
+    }
+  };
+
+  useImperativeHandle(ref, () => ({
+    drawJpeg: (base64) => submit({ type: "jpeg", data: base64 }),
+    drawVideoFrame: (frame) => submit({ type: "videoFrame", frame }, [frame]),
+    clear: () => {
+      if (workerRef.current) workerRef.current.postMessage({ type: "clear" });
+      else rendererRef.current?.clear();
+    },
+  }), []);
+
+  useEffect(() => {
+    const interval = setInterval(() => {
+      if (workerRef.current) workerRef.current.postMessage({ type: "stats" });
+      else if (rendererRef.current) report(rendererRef.current.takeStats());
+    }, STATS_INTERVAL_MS);
+    return () => {
+      clearInterval(interval);
+      workerRef.current?.terminate();
+      workerRef.current = null;
+      rendererRef.current = null;
+    };
+  }, []);
+
+  return <canvas ref={canvasRef} className="camera-feed" />;
 });
 
-export default CameraFeed;
\ No newline at end of file
+export default CameraFeed;
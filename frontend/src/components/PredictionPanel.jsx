@@ -2,7 +2,7 @@
 
 import React from "react";
 
-export default function PredictionPanel({ predictions }) {
+export default function PredictionPanel({ predictions, qosLevel = 0 }) {
   // Use placeholder data if predictions are not available yet
   const displayPredictions = {
     emotion: "-",
@@ -35,6 +35,11 @@ export default function PredictionPanel({ predictions }) {
             {displayPredictions.is_blurry ? "Blurry" : "Clear"}
           </span>
         </p>
+        {qosLevel > 0 && (
+          <p>
+            <strong>Performance Mode:</strong> reduced (level {qosLevel})
+          </p>
+        )}
       </div>
     </div>
   );
@@ -0,0 +1,59 @@
+// frontend/src/render/frameRenderer.js
+// Decodes and paints live-view frames onto one canvas. Runs inside the frame
+// worker (OffscreenCanvas) or, where that is unsupported, on the main thread.
+
+function base64ToBytes(b64) {
+  const binary = atob(b64);
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+  return bytes;
+}
+
+function summarize(values) {
+  if (!values.length) return { avg: 0, p95: 0, max: 0 };
+  const sorted = [...values].sort((a, b) => a - b);
+  const avg = sorted.reduce((total, v) => total + v, 0) / sorted.length;
+  const p95 = sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * 0.95))];
+  return { avg, p95, max: sorted[sorted.length - 1] };
+}
+
+export function createFrameRenderer(canvas) {
+  const ctx = canvas.getContext("2d");
+  let decodeMs = [];
+  let paintMs = [];
+
+  return {
+    // msg: { type: "jpeg", data: base64 } or { type: "videoFrame", frame: VideoFrame }
+    async render(msg) {
+      const t0 = performance.now();
+      const image = msg.type === "jpeg"
+        ? await createImageBitmap(new Blob([base64ToBytes(msg.data)], { type: "image/jpeg" }))
+        : msg.frame; // already decoded by WebCodecs
+      const t1 = performance.now();
+
+      const width = image.displayWidth ?? image.width;
+      const height = image.displayHeight ?? image.height;
+      if (canvas.width !== width || canvas.height !== height) {
+        canvas.width = width;
+        canvas.height = height;
+      }
+      ctx.drawImage(image, 0, 0);
+      image.close();
+
+      decodeMs.push(t1 - t0);
+      paintMs.push(performance.now() - t1);
+    },
+
+    clear() {
+      ctx.clearRect(0, 0, canvas.width, canvas.height);
+    },
+
+    // Timings since the previous call, in milliseconds
+    takeStats() {
+      const stats = { frames: decodeMs.length, decode_ms: summarize(decodeMs), paint_ms: summarize(paintMs) };
+      decodeMs = [];
+      paintMs = [];
+      return stats;
+    },
+  };
+}
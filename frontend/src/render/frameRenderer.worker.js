@@ -0,0 +1,31 @@
+// frontend/src/render/frameRenderer.worker.js
+// Web Worker that owns the live-view OffscreenCanvas.
+// Protocol: "init" (canvas), "jpeg" / "videoFrame" (answered with "ready"),
+// "clear", and "stats" (answered with the timings since the last request).
+
+import { createFrameRenderer } from "./frameRenderer.js";
+
+let renderer = null;
+
+self.onmessage = async (event) => {
+  const msg = event.data;
+  if (msg.type === "init") {
+    renderer = createFrameRenderer(msg.canvas);
+    return;
+  }
+  if (!renderer) return;
+
+  if (msg.type === "clear") {
+    renderer.clear();
+  } else if (msg.type === "stats") {
+    self.postMessage({ type: "stats", stats: renderer.takeStats() });
+  } else {
+    try {
+      await renderer.render(msg);
+    } catch (error) {
+      console.error("Frame render error: ", error);
+    } finally {
+      self.postMessage({ type: "ready" });
+    }
+  }
+};